@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import Dataset
+from config.app_config import AppConfig
+from tempo.tempo_client import TempoClient
+
+
+class FakeJiraClient:
+    """
+    Serves the issues of a synthetic dataset through the methods of `JiraClient` the pipeline calls.
+    """
+
+    def __init__(self, dataset: Dataset) -> None:
+        self.issues = [issue for issue, _ in dataset.issues]
+        self.histories = {issue.key: histories for issue, histories in dataset.issues}
+
+    def search_issues(self, start_at: int, max_results: int, updated_since: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None, account_ids: Optional[List[str]] = None) -> List[Any]:
+        return self.issues[start_at:start_at + max_results]
+
+    def get_issue_details(self, issues: List[Any]) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+        return ({issue.key: self.histories[issue.key] for issue in issues},
+                {issue.key: issue.fields.comment.comments for issue in issues})
+
+
+class FakeCalendarService:
+    """
+    Answers `events().list(...).execute()` like the Google Calendar API, from the events of a synthetic dataset.
+    """
+
+    def __init__(self, dataset: Dataset) -> None:
+        self.events_by_calendar = dataset.events
+        self.default_calendar = dataset.emails[0]
+
+    def events(self) -> 'FakeCalendarService':
+        return self
+
+    def list(self, calendarId: str, maxResults: int, pageToken: Optional[str] = None,
+             **params: Any) -> '_FakeRequest':
+        calendar_id = self.default_calendar if calendarId == 'primary' else calendarId
+        events = self.events_by_calendar.get(calendar_id, [])
+        start = int(pageToken or 0)
+        page: Dict[str, Any] = {'items': events[start:start + maxResults]}
+        if start + maxResults < len(events):
+            page['nextPageToken'] = str(start + maxResults)
+        return _FakeRequest(page)
+
+
+class _FakeRequest:
+    def __init__(self, response: Dict[str, Any]) -> None:
+        self.response = response
+
+    def execute(self) -> Dict[str, Any]:
+        return self.response
+
+
+class FakeTempoClient(TempoClient):
+    """
+    Builds worklogs like `TempoClient` and keeps the ones submitted instead of sending them.
+    Nothing is recorded in the journal, so every round of a benchmark submits the same worklogs again.
+    """
+
+    def __init__(self, config: AppConfig) -> None:
+        super().__init__(config)
+        self.submitted: List[Dict[str, Any]] = []
+
+    def submit_worklog(self, worklog: Dict[str, Any]) -> Dict[str, Any]:
+        self.submitted.append(worklog)
+        return worklog
+
+    def submit_worklogs(self, worklogs: List[Dict[str, Any]], skip_journaled: bool = True) -> List[Dict[str, Any]]:
+        self.submitted.extend(worklogs)
+        return worklogs
+
+    def reconcile_worklogs(self, start_date: datetime, end_date: datetime, worklogs: List[Dict[str, Any]],
+                           account_id: Optional[str] = None) -> Dict[str, Any]:
+        self.submitted.extend(worklogs)
+        return {'created': len(worklogs), 'updated': 0, 'deleted': 0, 'unchanged': 0, 'failed_days': []}
@@ -0,0 +1,208 @@
+"""
+Times each stage of the planning pipeline on a synthetic dataset, without any network access.
+
+    python -m benchmarks.run --users 5 --months 3 --issues 100 --save baseline.json
+    python -m benchmarks.run --users 5 --months 3 --issues 100 --compare baseline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+import main
+from benchmarks.fakes import FakeCalendarService, FakeJiraClient, FakeTempoClient
+from benchmarks.synthetic import Dataset, generate_dataset
+from config.app_config import AppConfig
+from config.app_context import AppContext
+from models.activity import Activity
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'benchmark.config.ini')
+
+
+def build_contexts(dataset: Dataset, timeline_engine: str) -> List[AppContext]:
+    config = AppConfig(CONFIG_FILE)
+    config.RUN_START_DATE = dataset.start_date.isoformat()
+    config.RUN_END_DATE = dataset.end_date.isoformat()
+    config.RUN_TIMELINE_ENGINE = timeline_engine
+    run_directory = tempfile.mkdtemp(prefix='tempofill-benchmark-')
+    config.RUN_PLAN_FILE = os.path.join(run_directory, 'plan.jsonl')
+    config.TEMPO_JOURNAL_FILE = os.path.join(run_directory, 'journal.jsonl')
+    contexts = []
+    for account_id, email in zip(dataset.account_ids, dataset.emails):
+        member_config = config.for_member(account_id, email)
+        contexts.append(AppContext(config=member_config, jira_client=FakeJiraClient(dataset),
+                                   tempo_client=FakeTempoClient(member_config),
+                                   calendar_service=FakeCalendarService(dataset)))
+    return contexts
+
+
+def plan_day_reference(day: date, day_activities: List[Activity]) -> List[Activity]:
+    """
+    `main.plan_day` with the original recursive `add_to_adjusted` placement.
+    """
+    config = main.context.config
+    day_start, day_end = main.get_day_time_bounds(day)
+    activities_by_type = defaultdict(list)
+    for act in day_activities:
+        activities_by_type[act.type].append(act)
+
+    adjusted_list: List[Activity] = []
+    for act_type in config.PRIORITY_ORDER:
+        for existing in activities_by_type.get(act_type, []):
+            start_time, end_time = main.adjust_activity_times(existing, day_start, day_end)
+            main.add_to_adjusted(adjusted_list, existing, start_time, end_time)
+    return adjusted_list
+
+
+def build_stages(contexts: List[AppContext]) -> Dict[str, Callable[[], Any]]:
+    """
+    Prepares the input of every stage from the output of the ones before it, so each can be timed on its own.
+    """
+    inputs = []
+    for app_context in contexts:
+        main.use_context(app_context)
+        from_date, to_date = main.get_run_range()
+        jira_activities = main.process_issues([], from_date=from_date, to_date=to_date)
+        calendar_activities = main.process_calendar_events(from_date, to_date)
+        sorted_activities = sorted(jira_activities + calendar_activities, key=Activity.sort_key)
+        days = list(main.organize_activities(sorted_activities))
+        inputs.append((app_context, from_date, to_date, sorted_activities, days))
+
+    def for_each_member(stage: Callable[..., Any]) -> Callable[[], Any]:
+        def run() -> List[Any]:
+            results = []
+            for app_context, *member_inputs in inputs:
+                main.use_context(app_context)
+                results.append(stage(*member_inputs))
+            return results
+        return run
+
+    return {
+        'process_issues': for_each_member(
+            lambda from_date, to_date, activities, days: main.process_issues([], from_date=from_date, to_date=to_date)),
+        'process_calendar_events': for_each_member(
+            lambda from_date, to_date, activities, days: main.process_calendar_events(from_date, to_date)),
+        'organize_activities': for_each_member(
+            lambda from_date, to_date, activities, days: list(main.organize_activities(activities))),
+        'add_to_adjusted': for_each_member(
+            lambda from_date, to_date, activities, days: [plan_day_reference(day, acts) for day, acts in days]),
+        'interval_resolver': for_each_member(
+            lambda from_date, to_date, activities, days: [main.plan_day(day, acts, Counter()) for day, acts in days]),
+        'plan_days': for_each_member(
+            lambda from_date, to_date, activities, days: list(main.plan_days(iter(activities), Counter()))),
+        'fill_tempo': for_each_member(
+            lambda from_date, to_date, activities, days: main.fill_tempo(main.context)),
+        'fill_tempo_async': for_each_member(
+            lambda from_date, to_date, activities, days: main.fill_tempo_async(main.context)),
+    }
+
+
+def measure(stage: Callable[[], Any], rounds: int) -> Dict[str, float]:
+    """
+    Runs the stage once under tracemalloc for its peak memory, then `rounds` more times for its timings.
+    """
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - started)
+    return {
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.mean(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': rounds,
+        'peak_memory_kib': peak / 1024
+    }
+
+
+def check_consistency(stages: Dict[str, Callable[[], Any]]) -> bool:
+    """
+    The interval resolver must place every activity exactly where `add_to_adjusted` does.
+    """
+    reference = stages['add_to_adjusted']()
+    resolved = stages['interval_resolver']()
+    return [[[act.to_dict() for act in day] for day in member] for member in reference] == \
+           [[[act.to_dict() for act in day] for day in member] for member in resolved]
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            max_regression: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['min'] > baseline[name]['min'] * (1 + max_regression):
+            regressions.append(f"{name}: {baseline[name]['min'] * 1000:.1f} ms -> {result['min'] * 1000:.1f} ms")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'stage':<26}{'min ms':>10}{'mean ms':>10}{'max ms':>10}{'stddev ms':>11}{'peak KiB':>12}")
+    for name, result in results.items():
+        print(f"{name:<26}{result['min'] * 1000:>10.1f}{result['mean'] * 1000:>10.1f}{result['max'] * 1000:>10.1f}"
+              f"{result['stddev'] * 1000:>11.1f}{result['peak_memory_kib']:>12.0f}")
+
+
+def main_benchmark(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the TempoFill pipeline on synthetic data.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--months', type=int, default=1)
+    parser.add_argument('--issues', type=int, default=50, help="issues per user and month")
+    parser.add_argument('--meetings-per-day', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--timeline-engine', default='python', choices=['python', 'numpy'])
+    parser.add_argument('--stage', action='append', help="only run the given stage, may be repeated")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="fail when a stage is slower than in this JSON file")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="tolerated slowdown of the fastest round against --compare, 0.2 is 20%%")
+    args = parser.parse_args(argv)
+
+    dataset = generate_dataset(seed=args.seed, users=args.users, months=args.months, issues=args.issues,
+                               meetings_per_day=args.meetings_per_day)
+    print(f"Dataset: {len(dataset.issues)} issues, "
+          f"{sum(len(histories) for _, histories in dataset.issues)} changelog entries, "
+          f"{sum(len(events) for events in dataset.events.values())} events, {args.users} users")
+
+    results = {}
+    # The pipeline reports every activity it finds, which would dominate the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stages = build_stages(build_contexts(dataset, args.timeline_engine))
+        consistent = check_consistency(stages)
+        for name, stage in stages.items():
+            if args.stage and name not in args.stage:
+                continue
+            results[name] = measure(stage, args.rounds)
+
+    print_results(results)
+    if not consistent:
+        print("interval_resolver and add_to_adjusted disagree on the synthetic dataset")
+        return 1
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=4)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_benchmark())
@@ -0,0 +1,123 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+WORKFLOW = ['Discuss / Design', 'Implement', 'Ready for review', 'Review', 'Done']
+BACKLOG_STATE = 'To Do'
+REOPEN_STATE = 'Implement'
+
+
+class Dataset(NamedTuple):
+    account_ids: List[str]
+    emails: List[str]
+    # Issues with their full changelog, shaped like the jira resources the pipeline reads
+    issues: List[Tuple[SimpleNamespace, List[SimpleNamespace]]]
+    # Calendar events per email, shaped like Google Calendar API items
+    events: Dict[str, List[Dict[str, Any]]]
+    start_date: date
+    end_date: date
+
+
+def generate_dataset(seed: int = 0, users: int = 1, months: int = 1, issues: int = 50,
+                     meetings_per_day: int = 3, start_date: date = date(2024, 1, 1)) -> Dataset:
+    """
+    Generates a reproducible project of `issues` issues per user and month, with their changelogs and comments,
+    and the meetings of each user.
+    """
+    rng = random.Random(seed)
+    account_ids = [f"synthetic-account-{index}" for index in range(users)]
+    emails = [f"user{index}@example.com" for index in range(users)]
+    end_date = start_date + timedelta(days=30 * months)
+
+    generated = []
+    for index in range(users * months * issues):
+        created = _random_time(rng, start_date, end_date)
+        generated.append(_generate_issue(rng, index, created, account_ids))
+
+    events = {email: _generate_events(rng, email, emails, start_date, end_date, meetings_per_day)
+              for email in emails}
+    return Dataset(account_ids, emails, generated, events, start_date, end_date)
+
+
+def _generate_issue(rng: random.Random, index: int, created: datetime,
+                    account_ids: List[str]) -> Tuple[SimpleNamespace, List[SimpleNamespace]]:
+    histories = []
+    assignee = rng.choice(account_ids)
+    now = created
+    state = BACKLOG_STATE
+    # Most issues go through the workflow once, some are reopened a few times
+    for _ in range(1 + (rng.random() < 0.2) * rng.randint(1, 4)):
+        for next_state in WORKFLOW[rng.randint(0, 1):]:
+            now += timedelta(minutes=rng.randint(10, 60 * 24))
+            if rng.random() < 0.15:
+                new_assignee = rng.choice(account_ids)
+                histories.append(_history(now, assignee, [_assignee_item(assignee, new_assignee)]))
+                assignee = new_assignee
+            histories.append(_history(now, assignee, [_status_item(state, next_state)]))
+            state = next_state
+        state, previous = REOPEN_STATE, state
+        now += timedelta(hours=rng.randint(1, 72))
+        histories.append(_history(now, rng.choice(account_ids), [_status_item(previous, state)]))
+    # The last reopen cycle is left open
+    histories.pop()
+
+    comments = [SimpleNamespace(created=_timestamp(created + timedelta(minutes=rng.randint(0, 60 * 24 * 20))),
+                                author=SimpleNamespace(accountId=rng.choice(account_ids)))
+                for _ in range(rng.randint(0, 5))]
+    issue = SimpleNamespace(
+        id=str(100000 + index),
+        key=f"SYN-{index + 1}",
+        fields=SimpleNamespace(updated=_timestamp(now), comment=SimpleNamespace(comments=comments))
+    )
+    return issue, histories
+
+
+def _generate_events(rng: random.Random, email: str, emails: List[str], start_date: date, end_date: date,
+                     meetings_per_day: int) -> List[Dict[str, Any]]:
+    events = []
+    day = start_date
+    while day < end_date:
+        if day.weekday() < 5:
+            for _ in range(rng.randint(0, 2 * meetings_per_day)):
+                start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc) + timedelta(
+                    minutes=15 * rng.randint(24, 68))
+                end = start + timedelta(minutes=15 * rng.randint(1, 8))
+                attendees = [{'email': attendee,
+                              'responseStatus': rng.choice(['accepted', 'accepted', 'accepted', 'declined'])}
+                             for attendee in dict.fromkeys([email, *rng.sample(emails, min(len(emails), 3))])]
+                events.append({
+                    'id': f"event-{len(events)}-{email}",
+                    'iCalUID': f"event-{len(events)}-{email}@example.com",
+                    'status': rng.choice(['confirmed'] * 9 + ['cancelled']),
+                    'summary': rng.choice(['Daily', 'Planning', 'Refinement', 'Retrospective', '1:1']),
+                    'start': {'dateTime': start.isoformat()},
+                    'end': {'dateTime': end.isoformat()},
+                    'attendees': attendees
+                })
+        day += timedelta(days=1)
+    return events
+
+
+def _history(created: datetime, author: str, items: List[SimpleNamespace]) -> SimpleNamespace:
+    return SimpleNamespace(created=_timestamp(created), author=SimpleNamespace(accountId=author), items=items)
+
+
+def _status_item(from_state: str, to_state: str) -> SimpleNamespace:
+    return SimpleNamespace(**{'field': 'status', 'from': None, 'to': None, 'fromString': from_state,
+                              'toString': to_state})
+
+
+def _assignee_item(from_account: str, to_account: str) -> SimpleNamespace:
+    return SimpleNamespace(**{'field': 'assignee', 'from': from_account, 'to': to_account, 'fromString': None,
+                              'toString': None})
+
+
+def _random_time(rng: random.Random, start_date: date, end_date: date) -> datetime:
+    start = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc)
+    return start + timedelta(minutes=rng.randint(0, (end_date - start_date).days * 24 * 60))
+
+
+def _timestamp(value: datetime) -> str:
+    # Jira renders milliseconds, e.g. 2024-01-01T10:15:30.000+0000
+    return value.strftime('%Y-%m-%dT%H:%M:%S.000%z')
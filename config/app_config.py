@@ -1,13 +1,23 @@
+import copy
+import os
+
 from .config_reader import ConfigReader
+from .work_states import WorkStateTable, parse_state_list
 
 
 class AppConfig:
-    def __init__(self):
-        self.config_reader = ConfigReader()
+    def __init__(self, config_file: str = 'config.ini'):
+        self.config_reader = ConfigReader(config_file)
 
         self.RUN_START_DATE = self.config_reader.get('run', 'start_date')
         self.RUN_END_DATE = self.config_reader.get('run', 'end_date')
         self.RUN_TIMEZONE = self.config_reader.get('run', 'timezone', fallback='UTC')
+        self.RUN_TIMELINE_ENGINE = self.config_reader.get('run', 'timeline_engine', fallback='python')
+        self.RUN_STATE_FILE = self.config_reader.get('run', 'state_file', fallback='.tempofill_state.json')
+        self.RUN_PLAN_FILE = self.config_reader.get('run', 'plan_file', fallback='.tempofill_plan.jsonl')
+        self.RUN_PIPELINE = self.config_reader.get('run', 'pipeline', fallback='phased')
+        self.RUN_INCREMENTAL_DAYS = self.config_reader.get_boolean('run', 'incremental_days', fallback=False)
+        self.RUN_LOG_LEVEL = self.config_reader.get('run', 'log_level', fallback='INFO').upper()
 
         self.JIRA_ACCOUNT_ID = self.config_reader.get('jira', 'account_id')
         self.JIRA_PROJECT = self.config_reader.get('jira', 'project')
@@ -15,15 +25,70 @@ class AppConfig:
         self.JIRA_USERNAME = self.config_reader.get_secure('jira', 'username', 'JIRA_USERNAME')
         self.JIRA_API_KEY = self.config_reader.get_secure('jira', 'api_key', 'JIRA_API_KEY')
         self.JIRA_MEETING_ISSUE_ID = self.config_reader.get('jira', 'meeting_issue_id')
+        self.JIRA_INCREMENTAL = self.config_reader.get_boolean('jira', 'incremental', fallback=False)
+        self.JIRA_PARTICIPATION_FILTER = self.config_reader.get_boolean('jira', 'participation_filter', fallback=False)
+        self.JIRA_CONCURRENCY = int(self.config_reader.get('jira', 'concurrency', fallback='8'))
+        self.JIRA_MAX_RETRIES = int(self.config_reader.get('jira', 'max_retries', fallback='5'))
 
         self.GCALENDAR_EMAIL = self.config_reader.get_secure('gcalendar', 'email', 'GCALENDAR_EMAIL')
+        self.GCALENDAR_CALENDAR_IDS = parse_state_list(
+            self.config_reader.get('gcalendar', 'calendar_ids', fallback='primary'))
+        self.GCALENDAR_INCREMENTAL = self.config_reader.get_boolean('gcalendar', 'incremental', fallback=False)
 
         self.TEMPO_API_KEY = self.config_reader.get_secure('tempo', 'api_key', 'TEMPO_API_KEY')
+        self.TEMPO_CONCURRENCY = int(self.config_reader.get('tempo', 'concurrency', fallback='4'))
+        self.TEMPO_MAX_RETRIES = int(self.config_reader.get('tempo', 'max_retries', fallback='5'))
+        self.TEMPO_SYNC_MODE = self.config_reader.get('tempo', 'sync_mode', fallback='append')
+        self.TEMPO_JOURNAL_FILE = self.config_reader.get('tempo', 'journal_file', fallback='.tempofill_journal.jsonl')
+
+        self.CACHE_ENABLED = self.config_reader.get_boolean('cache', 'enabled', fallback=False)
+        self.CACHE_OFFLINE = self.config_reader.get_boolean('cache', 'offline', fallback=False)
+        self.CACHE_FILE = self.config_reader.get('cache', 'file', fallback='.tempofill_cache.sqlite')
+        self.CACHE_TTL_HOURS = float(self.config_reader.get('cache', 'ttl_hours', fallback='12'))
+        self.CACHE_MAX_SIZE_MB = int(self.config_reader.get('cache', 'max_size_mb', fallback='512'))
+
+        self.METRICS_REPORT_FILE = self.config_reader.get('metrics', 'report_file', fallback='')
+        self.METRICS_PROMETHEUS_FILE = self.config_reader.get('metrics', 'prometheus_file', fallback='')
+        self.METRICS_PROFILE_FILE = self.config_reader.get('metrics', 'profile_file', fallback='')
+        self.METRICS_TRACEMALLOC = self.config_reader.get_boolean('metrics', 'tracemalloc', fallback=False)
+
+        self.OUTPUT_FORMAT = self.config_reader.get('output', 'format', fallback='json')
+        self.OUTPUT_FILE = self.config_reader.get('output', 'file', fallback='')
+        self.OUTPUT_PARQUET_FILE = self.config_reader.get('output', 'parquet_file', fallback='')
 
-        self.STARTED_WORK_STATES = self.config_reader.get('work_states', 'started_work_states', fallback='').split(', ')
-        self.FINISHED_WORK_STATES = self.config_reader.get('work_states', 'finished_work_states', fallback='').split(', ')
-        self.PRIORITY_ORDER = self.config_reader.get('work_states', 'priority_order', fallback='').split(', ')
+        self.TEAM_ROSTER_FILE = self.config_reader.get('team', 'roster_file', fallback='team.csv')
+        self.TEAM_WORKERS = int(self.config_reader.get('team', 'workers', fallback=str(os.cpu_count() or 1)))
+
+        self.DAEMON_HOST = self.config_reader.get('daemon', 'host', fallback='127.0.0.1')
+        self.DAEMON_PORT = int(self.config_reader.get('daemon', 'port', fallback='8642'))
+        self.DAEMON_SECRET = self.config_reader.get_secure('daemon', 'secret', 'TEMPOFILL_DAEMON_SECRET', fallback='')
+        self.DAEMON_INTERVAL_MINUTES = float(self.config_reader.get('daemon', 'interval_minutes', fallback='60'))
+        self.DAEMON_LOOKBACK_DAYS = int(self.config_reader.get('daemon', 'lookback_days', fallback='0'))
+
+        self.BULK_IMPORT_JIRA_REQUESTS_PER_SECOND = float(
+            self.config_reader.get('bulk_import', 'jira_requests_per_second', fallback='5'))
+        self.BULK_IMPORT_TEMPO_REQUESTS_PER_SECOND = float(
+            self.config_reader.get('bulk_import', 'tempo_requests_per_second', fallback='5'))
+
+        self.WORK_STATES = WorkStateTable(
+            parse_state_list(self.config_reader.get('work_states', 'started_work_states', fallback='')),
+            parse_state_list(self.config_reader.get('work_states', 'finished_work_states', fallback=''))
+        )
+        self.STARTED_WORK_STATES = frozenset(self.WORK_STATES.started.values())
+        self.FINISHED_WORK_STATES = frozenset(self.WORK_STATES.finished.values())
+        self.PRIORITY_ORDER = self.WORK_STATES.priority_order(
+            parse_state_list(self.config_reader.get('work_states', 'priority_order', fallback='')))
 
         self.WORKDAY_START_HOUR = int(self.config_reader.get('work_schedule', 'workday_start_hour', fallback='9'))
         self.WORKDAY_DURATION_HOURS = int(self.config_reader.get('work_schedule', 'workday_duration_hours', fallback='8'))
-        self.COMMENT_DURATION_HOURS = int(self.config_reader.get('work_schedule', 'comment_duration_hours', fallback='2'))
\ No newline at end of file
+        self.COMMENT_DURATION_HOURS = int(self.config_reader.get('work_schedule', 'comment_duration_hours', fallback='2'))
+
+    def for_member(self, account_id: str, email: str) -> 'AppConfig':
+        """
+        Returns a copy of the configuration that fills the worklogs of another team member.
+        """
+        member_config = copy.copy(self)
+        member_config.JIRA_ACCOUNT_ID = account_id
+        member_config.GCALENDAR_EMAIL = email
+        member_config.GCALENDAR_CALENDAR_IDS = [email]
+        return member_config
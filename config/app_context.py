@@ -0,0 +1,69 @@
+from typing import Any, Optional, TYPE_CHECKING
+
+import pytz
+
+from utils.metrics import RunMetrics
+from .app_config import AppConfig
+
+if TYPE_CHECKING:
+    from jira_client.jira_client import JiraClient
+    from planner.day_state import DayState
+    from tempo.tempo_client import TempoClient
+
+
+class AppContext:
+    """
+    Configuration and API clients of a run, each built on first use.
+    Nothing touches the network or the config file before it is needed, and anything passed in is used as is.
+    """
+
+    def __init__(self, config: Optional[AppConfig] = None, jira_client: Optional['JiraClient'] = None,
+                 tempo_client: Optional['TempoClient'] = None, calendar_service: Any = None,
+                 metrics: Optional[RunMetrics] = None) -> None:
+        self._config = config
+        self._jira_client = jira_client
+        self._tempo_client = tempo_client
+        self._calendar_service = calendar_service
+        self._tz = None
+        self._day_state = None
+        self.metrics = metrics if metrics is not None else RunMetrics()
+
+    @property
+    def config(self) -> AppConfig:
+        if self._config is None:
+            self._config = AppConfig()
+        return self._config
+
+    @property
+    def tz(self) -> Any:
+        if self._tz is None:
+            self._tz = pytz.timezone(self.config.RUN_TIMEZONE)
+        return self._tz
+
+    @property
+    def day_state(self) -> Optional['DayState']:
+        if self._day_state is None:
+            from planner.day_state import DayState
+            self._day_state = DayState.from_config(self.config)
+        return self._day_state
+
+    @property
+    def jira_client(self) -> 'JiraClient':
+        if self._jira_client is None:
+            from jira_client.jira_client import JiraClient
+            self._jira_client = JiraClient(self.config, self.metrics)
+        return self._jira_client
+
+    @property
+    def tempo_client(self) -> 'TempoClient':
+        if self._tempo_client is None:
+            from tempo.tempo_client import TempoClient
+            self._tempo_client = TempoClient(self.config, self.metrics)
+        return self._tempo_client
+
+    @property
+    def calendar_service(self) -> Any:
+        if self._calendar_service is None:
+            from gcalendar import gcalendar
+            self._calendar_service = gcalendar.get_calendar_service()
+        return self._calendar_service
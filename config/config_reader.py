@@ -22,8 +22,12 @@ class ConfigReader:
             else:
                 raise
 
-    def get_secure(self, section, option, env_var):
+    def get_boolean(self, section, option, fallback=False):
+        value = self.get(section, option, fallback=str(fallback))
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    def get_secure(self, section, option, env_var, fallback=None):
         value = os.getenv(env_var)
         if value is not None:
             return value
-        return self.get(section, option)
\ No newline at end of file
+        return self.get(section, option, fallback=fallback)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import csv
+from typing import List, NamedTuple
+
+
+class TeamMember(NamedTuple):
+    account_id: str
+    email: str
+
+
+def load_roster(path: str) -> List[TeamMember]:
+    """
+    Reads the team members from a CSV file with `account_id` and `email` columns.
+    """
+    with open(path, newline='') as roster_file:
+        members = [TeamMember(row['account_id'].strip(), row['email'].strip())
+                   for row in csv.DictReader(roster_file)
+                   if row.get('account_id', '').strip()]
+    if not members:
+        raise ValueError(f"Team roster {path} does not list any account_id")
+    return members
@@ -0,0 +1,95 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+START = 'start'
+FINISH = 'finish'
+SWITCH = 'switch'
+
+# The kind of a status change, with the work type it closes and the one it opens
+Transition = Tuple[str, Optional[str], Optional[str]]
+
+
+def normalize_state(state: Optional[str]) -> str:
+    """
+    Folds case and collapses whitespace, Jira status names are compared in this form.
+    """
+    return ' '.join(state.split()).casefold() if state else ''
+
+
+def parse_state_list(value: str) -> List[str]:
+    """
+    Splits a comma-separated list of states, however the commas are spaced, dropping empty entries.
+    """
+    return [' '.join(state.split()) for state in value.split(',') if state.strip()]
+
+
+class WorkStateTable:
+    """
+    Classifies status changes into starting, finishing or switching work, from precompiled state sets.
+    Changes between two started states switch work, from any other state into a started one start it, and from a
+    started into a finished state finish it. States match regardless of case and spacing, and the work types are
+    named as in the configuration. Classifications are remembered per distinct pair of status names.
+    """
+
+    def __init__(self, started_states: Iterable[str], finished_states: Iterable[str]) -> None:
+        self.started = self._canonical_names(started_states)
+        self.finished = self._canonical_names(finished_states)
+        if not self.started:
+            raise ValueError("[work_states] started_work_states is empty, no work would ever start")
+        if not self.finished:
+            raise ValueError("[work_states] finished_work_states is empty, no work would ever finish")
+        overlap = self.started.keys() & self.finished.keys()
+        if overlap:
+            raise ValueError(f"[work_states] states both start and finish work: "
+                             f"{', '.join(sorted(self.started[state] for state in overlap))}")
+
+        self.transitions: Dict[Tuple[str, str], str] = {}
+        for from_state in self.started:
+            for to_state in self.started:
+                self.transitions[from_state, to_state] = SWITCH
+            for to_state in self.finished:
+                self.transitions[from_state, to_state] = FINISH
+        self._classified: Dict[Tuple[Optional[str], Optional[str]], Optional[Transition]] = {}
+
+    @staticmethod
+    def _canonical_names(states: Iterable[str]) -> Dict[str, str]:
+        names: Dict[str, str] = {}
+        for state in states:
+            names.setdefault(normalize_state(state), state)
+        names.pop('', None)
+        return names
+
+    def canonical(self, state: str) -> Optional[str]:
+        """
+        Returns the configured name of a started or finished state.
+        """
+        normalized = normalize_state(state)
+        return self.started.get(normalized) or self.finished.get(normalized)
+
+    def priority_order(self, types: Iterable[str]) -> List[str]:
+        """
+        Names the started states of a priority order as configured, every one of them must be in it.
+        """
+        order = [self.started.get(normalize_state(work_type), work_type) for work_type in types]
+        missing = [state for state in self.started.values() if state not in order]
+        if missing:
+            raise ValueError(f"[work_states] started states missing from priority_order, their work would never "
+                             f"be logged: {', '.join(missing)}")
+        return order
+
+    def classify(self, from_state: Optional[str], to_state: Optional[str]) -> Optional[Transition]:
+        """
+        Returns the kind of a status change with the work types it closes and opens, or None when it moves no work.
+        """
+        key = (from_state, to_state)
+        if key not in self._classified:
+            self._classified[key] = self._classify(from_state, to_state)
+        return self._classified[key]
+
+    def _classify(self, from_state: Optional[str], to_state: Optional[str]) -> Optional[Transition]:
+        from_normalized, to_normalized = normalize_state(from_state), normalize_state(to_state)
+        kind = self.transitions.get((from_normalized, to_normalized))
+        if kind is None and to_normalized in self.started:
+            kind = START
+        if kind is None:
+            return None
+        return kind, self.started.get(from_normalized, from_state), self.canonical(to_state)
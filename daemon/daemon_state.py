@@ -0,0 +1,29 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from models.activity import Activity
+
+
+class DaemonState:
+    """
+    What the daemon keeps in memory between updates: the activities attributed to each issue, those read from
+    the calendar and the worklogs planned for each day of the window.
+    """
+
+    def __init__(self, from_date: datetime, to_date: datetime) -> None:
+        self.from_date = from_date
+        self.to_date = to_date
+        self.issue_activities: Dict[str, List[Activity]] = {}
+        self.calendar_activities: List[Activity] = []
+        self.plan: Dict[date, List[Activity]] = {}
+        self.polled_at: Optional[datetime] = None
+
+    def jira_activities(self) -> List[Activity]:
+        return [activity for activities in self.issue_activities.values() for activity in activities]
+
+    def worklogs_on(self, tempo_day: date) -> List[Activity]:
+        """
+        Returns the planned worklogs starting on the given day, which is the day Tempo files them under.
+        """
+        return [worklog for worklogs in self.plan.values() for worklog in worklogs
+                if worklog.start_time.date() == tempo_day]
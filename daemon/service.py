@@ -0,0 +1,253 @@
+"""
+The resident service started by `--daemon`. It keeps the plan of a window of days in memory and brings the days
+touched by polled or notified changes up to date, with the clients and day planning of the `main` pipeline.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import main as pipeline
+from config.app_context import AppContext
+from daemon.daemon_state import DaemonState
+from daemon.webhook_server import Trigger, WebhookServer
+from jira_client.harvest_state import HARVEST_MARGIN
+from models.activity import Activity
+from models.issue_work import IssueWork
+
+logger = logging.getLogger(__name__)
+
+# How often the daemon loop wakes up to check whether it was asked to stop
+DAEMON_TICK_SECONDS = 1.0
+
+
+def run_daemon(app_context: Optional[AppContext] = None, stop: Optional[threading.Event] = None) -> None:
+    """
+    Runs as a resident service with warm clients, caches and plan until interrupted or `stop` is set.
+    The run range is planned and reconciled once, then Jira is polled for updated issues every `interval_minutes`
+    and webhooks of changed issues or calendar events are handled as they arrive. Only the days whose worklogs
+    changed are planned again and reconciled with Tempo.
+    """
+    if app_context is not None:
+        pipeline.use_context(app_context)
+    context = pipeline.context
+    config = context.config
+    stop = stop or threading.Event()
+    interval = config.DAEMON_INTERVAL_MINUTES * 60
+
+    state: Optional[DaemonState] = start_daemon_window()
+    server = WebhookServer(config.DAEMON_HOST, config.DAEMON_PORT, config.DAEMON_SECRET)
+    server.start()
+    next_poll = time.monotonic() + interval
+    try:
+        while not stop.is_set():
+            triggers = wait_for_triggers(server, min(max(next_poll - time.monotonic(), 0), DAEMON_TICK_SECONDS))
+            polling = time.monotonic() >= next_poll
+            if not triggers and not polling:
+                continue
+            if polling:
+                next_poll = time.monotonic() + interval
+            try:
+                state = start_daemon_window() if state is None else update_daemon(state, triggers, polling)
+            except Exception:
+                # The state may be half updated, the window is loaded again on the next notification or poll
+                logger.exception("Update failed")
+                state = None
+            context.metrics.write_reports(config.METRICS_REPORT_FILE, config.METRICS_PROMETHEUS_FILE)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def wait_for_triggers(server: WebhookServer, timeout: float) -> List[Trigger]:
+    """
+    Waits up to `timeout` seconds for a notification and returns it with any others already queued.
+    """
+    triggers = []
+    try:
+        triggers.append(server.triggers.get(timeout=timeout))
+        while True:
+            triggers.append(server.triggers.get_nowait())
+    except queue.Empty:
+        return triggers
+
+
+def start_daemon_window() -> DaemonState:
+    """
+    Fetches and plans the whole window from scratch and reconciles it with Tempo.
+    """
+    context = pipeline.context
+    config = context.config
+    if config.DAEMON_LOOKBACK_DAYS:
+        config.RUN_START_DATE, config.RUN_END_DATE = get_daemon_window()
+    state = DaemonState(*pipeline.get_run_range())
+    logger.info(f"Loading the worklogs from {config.RUN_START_DATE} to {config.RUN_END_DATE}")
+
+    polled_at = datetime.now(timezone.utc)
+    for issue, histories, comments in fetch_updated_issues(state, state.from_date - HARVEST_MARGIN):
+        replace_issue_activities(state, issue.key, attribute_single_issue(issue, histories, comments))
+    state.calendar_activities = pipeline.process_calendar_events(state.from_date, state.to_date)
+    state.plan = dict(pipeline.plan_worklog_days(state.jira_activities(), state.calendar_activities,
+                                                 state.from_date, state.to_date))
+    state.polled_at = polled_at
+
+    tempo_logs = [tempo_log for day_logs in state.plan.values() for tempo_log in day_logs]
+    if pipeline.should_submit():
+        with context.metrics.stage('submit'):
+            if context.day_state is not None:
+                pipeline.reconcile_dirty_days(tempo_logs, state.from_date, state.to_date)
+            else:
+                result = context.tempo_client.reconcile_worklogs(state.from_date, state.to_date - timedelta(days=1),
+                                                                 pipeline.build_worklogs(tempo_logs))
+                pipeline.report_failed_days(result['failed_days'])
+    return state
+
+
+def get_daemon_window() -> Tuple[str, str]:
+    """
+    Returns the start and end dates of the moving window of the last `lookback_days` up to today.
+    """
+    context = pipeline.context
+    today = datetime.now(context.tz).date()
+    return (today - timedelta(days=context.config.DAEMON_LOOKBACK_DAYS)).isoformat(), \
+        (today + timedelta(days=1)).isoformat()
+
+
+def update_daemon(state: DaemonState, triggers: List[Trigger], polling: bool) -> DaemonState:
+    """
+    Applies the notified and, when polling, the polled changes and syncs the days they affect.
+    Returns the state to carry on with, a new one when the window moved to another day.
+    """
+    config = pipeline.context.config
+    if config.DAEMON_LOOKBACK_DAYS and get_daemon_window() != (config.RUN_START_DATE, config.RUN_END_DATE):
+        return start_daemon_window()
+
+    days = set()
+    issue_keys = {trigger.issue_key for trigger in triggers if trigger.source == 'jira'}
+    if polling:
+        polled_at = datetime.now(timezone.utc)
+        for issue, histories, comments in fetch_updated_issues(state, state.polled_at - HARVEST_MARGIN):
+            days |= replace_issue_activities(state, issue.key, attribute_single_issue(issue, histories, comments))
+            issue_keys.discard(issue.key)
+        state.polled_at = polled_at
+    if issue_keys:
+        days |= refresh_issues(state, issue_keys)
+
+    if polling or any(trigger.source == 'calendar' for trigger in triggers):
+        calendar_activities = pipeline.process_calendar_events(state.from_date, state.to_date)
+        days |= activity_days(set(state.calendar_activities) ^ set(calendar_activities))
+        state.calendar_activities = calendar_activities
+
+    tempo_days = replan_days(state, days)
+    if tempo_days:
+        sync_tempo_days(state, tempo_days)
+    return state
+
+
+def fetch_updated_issues(state: DaemonState, updated_since: datetime,
+                         max_results: int = 100) -> Iterator[Tuple[SimpleNamespace, List[Any], List[Any]]]:
+    for issues in pipeline.search_pages(max_results=max_results, updated_since=updated_since,
+                                        created_before=state.to_date + HARVEST_MARGIN):
+        histories_by_issue, comments_by_issue = pipeline.fetch_issue_details(issues)
+        pipeline.count_issues(issues, histories_by_issue, comments_by_issue)
+        for issue in issues:
+            yield issue, histories_by_issue[issue.key], comments_by_issue[issue.key]
+
+
+def refresh_issues(state: DaemonState, issue_keys: Set[str]) -> Set[date]:
+    """
+    Fetches the notified issues of the project again and returns the days their work changed on.
+    """
+    context = pipeline.context
+    jira_client = context.jira_client
+    issue_keys = {key for key in issue_keys if key.startswith(f"{context.config.JIRA_PROJECT}-")}
+    with context.metrics.stage('fetch_jira'):
+        issues = [issue for issue in (jira_client.get_issue(key) for key in issue_keys) if issue is not None]
+        histories_by_issue, comments_by_issue = jira_client.get_issue_details(issues) if issues else ({}, {})
+    pipeline.count_issues(issues, histories_by_issue, comments_by_issue)
+
+    days = set()
+    for issue in issues:
+        days |= replace_issue_activities(state, issue.key, attribute_single_issue(
+            issue, histories_by_issue[issue.key], comments_by_issue[issue.key]))
+    # Deleted issues take their work with them
+    for key in issue_keys - {issue.key for issue in issues}:
+        days |= replace_issue_activities(state, key, [])
+    return days
+
+
+def attribute_single_issue(issue: SimpleNamespace, histories: List[Any], comments: List[Any]) -> List[Activity]:
+    issue_work: Dict[str, IssueWork] = dict()
+    with pipeline.context.metrics.stage('attribute'):
+        pipeline.attribute_issue(issue, histories, comments, issue_work, [])
+    return pipeline.complete_work(issue_work).get(issue.key, [])
+
+
+def replace_issue_activities(state: DaemonState, key: str, activities: List[Activity]) -> Set[date]:
+    """
+    Stores the work found on an issue and returns the days on which it differs from the stored one.
+    """
+    previous = state.issue_activities.pop(key, [])
+    if activities:
+        state.issue_activities[key] = activities
+    return activity_days(set(previous) ^ set(activities))
+
+
+def activity_days(activities: Iterable[Activity]) -> Set[date]:
+    """
+    Returns the days `organize_activities` files the pieces of the activities under.
+    """
+    return {piece.start_time.date() for activity in activities for piece in pipeline.break_into_days(activity)
+            if piece.key != 'Out of office'}
+
+
+def replan_days(state: DaemonState, days: Set[date]) -> Set[date]:
+    """
+    Plans the given days again from the activities reaching them and returns the Tempo days whose worklogs changed.
+    """
+    if not days:
+        return set()
+    jira_activities = [activity for activity in state.jira_activities() if activity_days([activity]) & days]
+    calendar_activities = [activity for activity in state.calendar_activities if activity_days([activity]) & days]
+    replanned: Dict[date, List[Activity]] = {day: [] for day in days}
+    for day, day_logs in pipeline.plan_worklog_days(jira_activities, calendar_activities, state.from_date,
+                                                    state.to_date):
+        if day in replanned:
+            replanned[day] = day_logs
+
+    tempo_days = set()
+    for day, day_logs in replanned.items():
+        previous = state.plan.pop(day, [])
+        if day_logs:
+            state.plan[day] = day_logs
+        if day_logs != previous:
+            tempo_days.update(tempo_log.start_time.date() for tempo_log in previous + day_logs)
+    return tempo_days
+
+
+def sync_tempo_days(state: DaemonState, tempo_days: Set[date]) -> None:
+    """
+    Reconciles the worklogs of the given Tempo days with the plan.
+    """
+    context = pipeline.context
+    tempo_client = context.tempo_client
+    day_state = context.day_state
+    logger.info(f"Syncing the worklogs of {', '.join(day.isoformat() for day in sorted(tempo_days))}")
+    if not pipeline.should_submit():
+        return
+    failed_days = []
+    with context.metrics.stage('submit'):
+        for tempo_day in sorted(tempo_days):
+            day_start = datetime.combine(tempo_day, datetime.min.time())
+            day_logs = state.worklogs_on(tempo_day)
+            result = tempo_client.reconcile_worklogs(day_start, day_start, pipeline.build_worklogs(day_logs))
+            failed_days.extend(result['failed_days'])
+            if day_state is not None:
+                day_state.set_synced(tempo_day, tempo_day, day_logs, pipeline.parse_days(result['failed_days']))
+    pipeline.report_failed_days(failed_days)
+    if day_state is not None:
+        day_state.save()
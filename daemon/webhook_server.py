@@ -0,0 +1,85 @@
+import json
+import logging
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Trigger(NamedTuple):
+    """
+    A change notification: `source` is 'jira' or 'calendar', Jira notifications carry the key of the issue.
+    """
+    source: str
+    issue_key: Optional[str] = None
+
+
+class WebhookServer:
+    """
+    Local HTTP endpoint taking Jira webhooks on `POST /jira` and Google Calendar push notifications on
+    `POST /calendar`. Notifications are only queued in `triggers`, the daemon loop acts on them.
+    With a secret, requests must carry it as the `token` query parameter or the `X-Goog-Channel-Token` header,
+    which is where Calendar puts the token of the watch channel.
+    """
+
+    def __init__(self, host: str, port: int, secret: str = '') -> None:
+        self.secret = secret
+        self.triggers: 'queue.Queue[Trigger]' = queue.Queue()
+        self._server = ThreadingHTTPServer((host, port), _WebhookHandler)
+        self._server.webhooks = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='webhooks', daemon=True)
+        self._thread.start()
+        logger.info(f"Listening for Jira webhooks on {self.address}/jira "
+                    f"and Calendar notifications on {self.address}/calendar")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    server_version = 'tempofill'
+
+    def do_POST(self) -> None:
+        webhooks: WebhookServer = self.server.webhooks
+        url = urlparse(self.path)
+        token = parse_qs(url.query).get('token', [None])[0] or self.headers.get('X-Goog-Channel-Token')
+        if webhooks.secret and token != webhooks.secret:
+            self._reply(403)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if url.path == '/jira':
+            try:
+                issue_key = json.loads(body)['issue']['key']
+            except (ValueError, KeyError, TypeError):
+                self._reply(400)
+                return
+            webhooks.triggers.put(Trigger('jira', issue_key))
+        elif url.path == '/calendar':
+            # Calendar confirms a new watch channel with a `sync` message, it does not report a change
+            if self.headers.get('X-Goog-Resource-State') != 'sync':
+                webhooks.triggers.put(Trigger('calendar'))
+        else:
+            self._reply(404)
+            return
+        self._reply(202)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"Webhook {self.address_string()}: {format % args}")
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from storage.response_cache import ResponseCache
+from storage.state_store import StateStore
+from utils.metrics import RunMetrics
+
+# Only the parts of an event the pipeline reads, plus the identifiers needed to merge incremental changes
+EVENT_FIELDS = ('nextPageToken,nextSyncToken,'
+                'items(id,iCalUID,status,summary,start,end,attendees(email,responseStatus))')
+EVENTS_PAGE_SIZE = 2500
+
+
+class CalendarEventReader:
+    """
+    Reads the events of one or more calendars page by page.
+    When a state store is given, the Calendar API sync token is kept so later runs only download changed events.
+    """
+
+    def __init__(self, service: Any, store: Optional[StateStore] = None, cache: Optional[ResponseCache] = None,
+                 metrics: Optional[RunMetrics] = None) -> None:
+        self.service = service
+        self.store = store
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else RunMetrics()
+
+    def list_events(self, calendar_ids: List[str], time_min: datetime, time_max: datetime) -> List[Dict[str, Any]]:
+        events: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for calendar_id in calendar_ids:
+            for event in self._list_calendar_events(calendar_id, time_min, time_max):
+                # The same meeting shows up once per calendar it was shared with
+                start = event['start'].get('dateTime', event['start'].get('date'))
+                events.setdefault((event.get('iCalUID', event['id']), start), event)
+        return list(events.values())
+
+    def _list_calendar_events(self, calendar_id: str, time_min: datetime,
+                              time_max: datetime) -> List[Dict[str, Any]]:
+        state_key = f"calendar:{calendar_id}:{time_min.isoformat()}:{time_max.isoformat()}"
+        state = self.store.get(state_key) if self.store else None
+
+        events: Dict[str, Dict[str, Any]] = {}
+        sync_token = None
+        if state:
+            try:
+                changed_events, sync_token = self._fetch_pages(calendarId=calendar_id, singleEvents=True,
+                                                               syncToken=state['sync_token'])
+                events = state['events']
+                for event in changed_events:
+                    if event.get('status') == 'cancelled':
+                        events.pop(event['id'], None)
+                    else:
+                        events[event['id']] = event
+            except HttpError as error:
+                # 410 Gone: the sync token expired and a full sync is required
+                if error.resp.status != 410:
+                    raise
+                state = None
+        if not state:
+            all_events, sync_token = self._fetch_pages(calendarId=calendar_id, singleEvents=True,
+                                                       timeMin=time_min.isoformat(), timeMax=time_max.isoformat())
+            events = {event['id']: event for event in all_events}
+
+        events = {event_id: event for event_id, event in events.items() if _in_window(event, time_min, time_max)}
+        if self.store and sync_token:
+            self.store.set(state_key, {'sync_token': sync_token, 'events': events})
+        return list(events.values())
+
+    def _fetch_pages(self, **params: Any) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        items: List[Dict[str, Any]] = []
+        page_token = None
+        while True:
+            events_result = self._list_page(pageToken=page_token, maxResults=EVENTS_PAGE_SIZE, fields=EVENT_FIELDS,
+                                            **params)
+            items.extend(events_result.get('items', []))
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                # The sync token is only handed out with the last page
+                return items, events_result.get('nextSyncToken')
+
+    def _list_page(self, **params: Any) -> Dict[str, Any]:
+        def fetch() -> Dict[str, Any]:
+            with self.metrics.timed_request('gcalendar'):
+                return self.service.events().list(**params).execute()
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch('calendar', 'events.list', params, fetch)
+
+
+def _in_window(event: Dict[str, Any], time_min: datetime, time_max: datetime) -> bool:
+    start = datetime.fromisoformat(event['start'].get('dateTime', event['start'].get('date')))
+    end = datetime.fromisoformat(event['end'].get('dateTime', event['end'].get('date')))
+    if start.tzinfo is None or end.tzinfo is None:
+        # All-day events only carry a date
+        return start.date() < time_max.date() and end.date() > time_min.date()
+    return start < time_max and end > time_min
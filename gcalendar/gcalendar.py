@@ -1,39 +1,50 @@
 from __future__ import print_function
 
+import logging
 import os.path
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 
-creds = None
 token_file = 'token.json'
 credentials_file = 'credentials.json'
-# The file token.json stores the user's access and refresh tokens, and is
-# created automatically when the authorization flow completes for the first
-# time.
-if os.path.exists(token_file):
-    creds = Credentials.from_authorized_user_file(token_file, SCOPES)
-# If there are no (valid) credentials available, let the user log in.
-if not creds or not creds.valid:
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-    else:
-        flow = InstalledAppFlow.from_client_secrets_file(
-            credentials_file, SCOPES)
-        creds = flow.run_local_server(port=0)
-    # Save the credentials for the next run
-    with open(token_file, 'w') as token:
-        token.write(creds.to_json())
-
-
-def get_calendar_service():
+
+logger = logging.getLogger(__name__)
+
+
+def get_credentials():
+    # The Google client libraries are slow to import, they are only loaded once credentials are needed
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds = None
+    # The file token.json stores the user's access and refresh tokens, and is
+    # created automatically when the authorization flow completes for the first
+    # time.
+    if os.path.exists(token_file):
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+    # If there are no (valid) credentials available, let the user log in.
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                credentials_file, SCOPES)
+            creds = flow.run_local_server(port=0)
+        # Save the credentials for the next run
+        with open(token_file, 'w') as token:
+            token.write(creds.to_json())
+    return creds
+
+
+def get_calendar_service(creds=None):
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+
     try:
-        return build('calendar', 'v3', credentials=creds)
+        # The discovery document bundled with the library is used instead of downloading it on every start
+        return build('calendar', 'v3', credentials=creds or get_credentials(), static_discovery=True,
+                     cache_discovery=False)
     except HttpError as error:
-        print('An error occurred: %s' % error)
+        logger.error('An error occurred: %s', error)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from models.activity import Activity
+from storage.state_store import StateStore
+
+# Jira evaluates JQL dates in the profile timezone of the API user, so bounds are widened by a day.
+# Re-fetching an issue is harmless because its work is replaced, never appended.
+HARVEST_MARGIN = timedelta(days=1)
+
+
+class HarvestState:
+    """
+    High-water mark of incrementally harvested issues together with the work attributed to them.
+    Issues untouched since the last run are served from here instead of being searched again.
+    Everything is forgotten when the settings the attribution depends on change.
+    """
+
+    def __init__(self, store: StateStore, scope: str, settings: Dict[str, Any]) -> None:
+        self.store = store
+        self.key = f"harvest:{scope}"
+        self.settings = settings
+        self.state = store.get(self.key) or {}
+        if self.state.get('settings') != settings:
+            self.state = {}
+
+    def updated_since(self, start_date: datetime) -> datetime:
+        """
+        Returns the lower `updated` bound for the next search.
+        Falls back to the start of the run when the stored harvest does not cover it.
+        """
+        lower_bound = start_date - HARVEST_MARGIN
+        if not self._covers(lower_bound):
+            self.state = {}
+            return lower_bound
+        high_water_mark = datetime.fromisoformat(self.state['high_water_mark']) - HARVEST_MARGIN
+        return max(lower_bound, high_water_mark)
+
+    def merge(self, issue_work: Dict[str, List[Activity]], start_date: datetime,
+              high_water_mark: Optional[datetime]) -> Dict[str, List[Activity]]:
+        """
+        Replaces the stored work of every freshly harvested issue and persists the new high-water mark.
+        """
+        stored_issues = self.state.get('issues', {})
+        merged = {key: [Activity.from_dict(work) for work in works] for key, works in stored_issues.items()}
+        merged.update(issue_work)
+
+        previous_mark = self.state.get('high_water_mark')
+        if high_water_mark is None and previous_mark is not None:
+            high_water_mark = datetime.fromisoformat(previous_mark)
+        covered_from = self.state.get('covered_from') or (start_date - HARVEST_MARGIN).isoformat()
+
+        self.state = {
+            'settings': self.settings,
+            'covered_from': covered_from,
+            'high_water_mark': high_water_mark.isoformat() if high_water_mark else None,
+            'issues': {key: [work.to_dict() for work in works] for key, works in merged.items()}
+        }
+        self.store.set(self.key, self.state)
+        return merged
+
+    def _covers(self, lower_bound: datetime) -> bool:
+        covered_from = self.state.get('covered_from')
+        if not covered_from or not self.state.get('high_water_mark'):
+            return False
+        return datetime.fromisoformat(covered_from) <= lower_bound
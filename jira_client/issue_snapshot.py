@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from typing import Any, List
+
+
+def snapshot_issue(issue: Any, histories: List[Any], comments: List[Any]) -> SimpleNamespace:
+    """
+    Copies the fields attribution reads from an issue, its changelog and its comments into plain namespaces.
+    Unlike jira resources, which hold on to their HTTP session, snapshots can be pickled to worker processes.
+    """
+    return SimpleNamespace(
+        id=issue.id,
+        key=issue.key,
+        fields=SimpleNamespace(
+            updated=issue.fields.updated,
+            comment=SimpleNamespace(comments=[_snapshot_comment(comment) for comment in comments])
+        ),
+        histories=[_snapshot_history(history) for history in histories]
+    )
+
+
+def _snapshot_comment(comment: Any) -> SimpleNamespace:
+    return SimpleNamespace(created=comment.created, author=_snapshot_author(comment))
+
+
+def _snapshot_history(history: Any) -> SimpleNamespace:
+    return SimpleNamespace(
+        created=history.created,
+        author=_snapshot_author(history),
+        items=[_snapshot_item(item) for item in history.items]
+    )
+
+
+def _snapshot_item(item: Any) -> SimpleNamespace:
+    return SimpleNamespace(**{
+        'field': item.field,
+        'from': getattr(item, 'from', None),
+        'to': getattr(item, 'to', None),
+        'fromString': getattr(item, 'fromString', None),
+        'toString': getattr(item, 'toString', None)
+    })
+
+
+def _snapshot_author(record: Any) -> SimpleNamespace:
+    # Changes made by automation or deleted users come without an author
+    author = getattr(record, 'author', None)
+    return SimpleNamespace(accountId=getattr(author, 'accountId', None))
@@ -1,40 +1,239 @@
-from datetime import datetime
-from typing import List, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List, Any, Optional, Dict, Tuple, Callable
 
-import requests
-from jira import JIRA, Issue, resources
-from jira.client import ResultList
-from jira.resources import Resource
 from requests.auth import HTTPBasicAuth
 
 from config.app_config import AppConfig
+from jira_client.json_objects import to_namespace
+from storage.response_cache import ResponseCache
+from utils.http_session import RateLimiter, build_session, request_with_backoff
+from utils.metrics import RunMetrics
+from utils.timestamps import created_at
+
+HISTORIES_PAGE_SIZE = 100
+COMMENTS_PAGE_SIZE = 100
+# Limits of the bulk changelog endpoint: issues per request and changelog entries per page
+BULK_CHANGELOG_ISSUES = 1000
+BULK_CHANGELOG_PAGE_SIZE = 1000
+# The only issue fields the pipeline reads, the changelog comes through `expand`
+SEARCH_FIELDS = 'comment,updated'
 
 
 class JiraClient:
-    def __init__(self, config: AppConfig) -> None:
+    def __init__(self, config: AppConfig, metrics: Optional[RunMetrics] = None) -> None:
         self.config = config
-        self.jira = JIRA(config.JIRA_SERVER, basic_auth=(config.JIRA_USERNAME, config.JIRA_API_KEY))
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.cache = ResponseCache.from_config(config)
         self.auth = HTTPBasicAuth(config.JIRA_USERNAME, config.JIRA_API_KEY)
+        self.session = build_session(config.JIRA_CONCURRENCY, auth=self.auth, headers={"Accept": "application/json"})
+        self.metrics.instrument(self.session, 'jira')
+        self.bulk_rate_limiter = RateLimiter(config.BULK_IMPORT_JIRA_REQUESTS_PER_SECOND)
+
+    def _cached(self, endpoint: str, params: Dict[str, Any], fetch: Callable[[], Any],
+                validator: Optional[str] = None) -> Any:
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch('jira', endpoint, params, fetch, validator=validator)
+
+    def search_issues(self, start_at: int, max_results: int, updated_since: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None, account_ids: Optional[List[str]] = None,
+                      expand_changelog: bool = True) -> List[SimpleNamespace]:
+        """
+        Returns a page of issues with only the fields the pipeline reads, as namespaces shaped like jira resources.
+        Without `expand_changelog`, the issues come without their first page of changelog.
+        """
+        url = f"{self.config.JIRA_SERVER}/rest/api/3/search"
+        params = {"jql": self.build_jql(updated_since, created_before, account_ids), "startAt": start_at,
+                  "maxResults": max_results, "fields": SEARCH_FIELDS}
+        if expand_changelog:
+            params["expand"] = 'changelog'
+        result = self._cached('search', params, lambda: self._get_json(url, params))
+        return to_namespace(result['issues'])
 
-    def search_issues(self, start_at: int, max_results: int) -> ResultList[Issue]:
-        jql = f"project = '{self.config.JIRA_PROJECT}' ORDER BY updated ASC"
-        issues = self.jira.search_issues(jql, startAt=start_at, maxResults=max_results, expand='changelog, comment')
-        return issues
+    def get_issue(self, issueIdOrKey: str) -> Optional[SimpleNamespace]:
+        """
+        Returns a single issue shaped like the search results, or None when it no longer exists.
+        Always fetched fresh, it is asked for because the issue just changed.
+        """
+        url = f"{self.config.JIRA_SERVER}/rest/api/3/issue/{issueIdOrKey}"
+        response = request_with_backoff(
+            self.session,
+            'GET',
+            url,
+            max_retries=self.config.JIRA_MAX_RETRIES,
+            metrics=self.metrics,
+            client='jira',
+            params={"fields": SEARCH_FIELDS, "expand": 'changelog'}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return to_namespace(response.json())
 
-    def fetch_histories(self, issueIdOrKey: str, start_at: int, max_results: int) -> Resource:
+    def build_jql(self, updated_since: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                  account_ids: Optional[List[str]] = None) -> str:
+        """
+        Builds the issue search. With the participation filter, `account_ids` widens it to issues any of the
+        given accounts took part in, defaulting to the configured account.
+        """
+        clauses = [f"project = '{self.config.JIRA_PROJECT}'"]
+        if updated_since is not None:
+            clauses.append(f"updated >= '{updated_since.strftime('%Y/%m/%d %H:%M')}'")
+        if created_before is not None:
+            clauses.append(f"created < '{created_before.strftime('%Y/%m/%d %H:%M')}'")
+        if self.config.JIRA_PARTICIPATION_FILTER:
+            # Comments are not searchable by author, Jira watches commented issues by default instead
+            participation = [f"assignee WAS '{account_id}' OR status CHANGED BY '{account_id}' "
+                             f"OR watcher = '{account_id}'"
+                             for account_id in account_ids or [self.config.JIRA_ACCOUNT_ID]]
+            clauses.append(f"({' OR '.join(participation)})")
+        return f"{' AND '.join(clauses)} ORDER BY updated ASC"
+
+    def fetch_histories(self, issueIdOrKey: str, start_at: int, max_results: int,
+                        updated: Optional[str] = None) -> SimpleNamespace:
+        """
+        Fetches a page of the changelog. Given the `updated` timestamp of the issue, the cached page is reused
+        for as long as the issue stays unchanged.
+        """
         url = f"{self.config.JIRA_SERVER}/rest/api/3/issue/{issueIdOrKey}/changelog"
-        headers = {
-            "Accept": "application/json"
-        }
-        response = requests.get(
+        params = {"startAt": start_at, "maxResults": max_results}
+        return to_namespace(self._cached(url, params, lambda: self._get_json(url, params), validator=updated))
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Any:
+        response = request_with_backoff(
+            self.session,
+            'GET',
             url,
-            headers=headers,
-            params={"startAt": start_at, "maxResults": max_results},
-            auth=self.auth
+            max_retries=self.config.JIRA_MAX_RETRIES,
+            metrics=self.metrics,
+            client='jira',
+            params=params
         )
-        return resources.dict2resource(response.json())
+        response.raise_for_status()
+        return response.json()
+
+    def get_all_histories(self, issue: SimpleNamespace) -> List[Any]:
+        return self._collect_histories(issue, {})
+
+    def get_issue_details(self, issues: List[SimpleNamespace]) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+        """
+        Fetches the changelog and comment pages missing from the search results of all given issues concurrently.
+        Every issue yields exactly the histories `get_all_histories` would return for it, and all of its comments.
+        """
+        with ThreadPoolExecutor(max_workers=self.config.JIRA_CONCURRENCY) as executor:
+            history_pages = {
+                issue.key: {page: executor.submit(self.fetch_histories, issue.key, *page, issue.fields.updated)
+                            for page in self._plan_history_pages(issue)}
+                for issue in issues
+            }
+            comment_pages = {
+                issue.key: [executor.submit(self.fetch_comments, issue.key, start_at, COMMENTS_PAGE_SIZE,
+                                            issue.fields.updated)
+                            for start_at in self._plan_comment_pages(issue)]
+                for issue in issues
+            }
+            histories = {issue.key: self._collect_histories(issue, history_pages[issue.key]) for issue in issues}
+            comments = {issue.key: self._collect_comments(issue, comment_pages[issue.key]) for issue in issues}
+        return histories, comments
 
-    def get_all_histories(self, issue: Issue) -> List[Any]:
+    def get_bulk_issue_details(self, issues: List[SimpleNamespace]) -> Tuple[Dict[str, List[Any]],
+                                                                             Dict[str, List[Any]]]:
+        """
+        `get_issue_details` for issues searched without their changelog. The changelogs are fetched through the
+        bulk endpoint, up to `BULK_CHANGELOG_ISSUES` issues per request, while the comment pages download.
+        """
+        with ThreadPoolExecutor(max_workers=self.config.JIRA_CONCURRENCY) as executor:
+            comment_pages = {
+                issue.key: [executor.submit(self.fetch_comments, issue.key, start_at, COMMENTS_PAGE_SIZE,
+                                            issue.fields.updated)
+                            for start_at in self._plan_comment_pages(issue)]
+                for issue in issues
+            }
+            issue_ids = [issue.id for issue in issues]
+            chunks = [executor.submit(self.bulk_fetch_changelogs, issue_ids[start:start + BULK_CHANGELOG_ISSUES])
+                      for start in range(0, len(issue_ids), BULK_CHANGELOG_ISSUES)]
+            histories_by_id: Dict[str, List[Any]] = {}
+            for chunk in chunks:
+                histories_by_id.update(chunk.result())
+            comments = {issue.key: self._collect_comments(issue, comment_pages[issue.key]) for issue in issues}
+        histories = {issue.key: sorted(histories_by_id.get(str(issue.id), []), key=created_at) for issue in issues}
+        return histories, comments
+
+    def bulk_fetch_changelogs(self, issue_ids: List[str]) -> Dict[str, List[Any]]:
+        """
+        Fetches the whole changelogs of up to `BULK_CHANGELOG_ISSUES` issues, following `nextPageToken`.
+        """
+        url = f"{self.config.JIRA_SERVER}/rest/api/3/changelog/bulkfetch"
+        body: Dict[str, Any] = {"issueIdsOrKeys": issue_ids, "maxResults": BULK_CHANGELOG_PAGE_SIZE}
+        histories: Dict[str, List[Any]] = {}
+        while True:
+            response = request_with_backoff(
+                self.session,
+                'POST',
+                url,
+                max_retries=self.config.JIRA_MAX_RETRIES,
+                metrics=self.metrics,
+                client='jira',
+                rate_limiter=self.bulk_rate_limiter,
+                json=body
+            )
+            response.raise_for_status()
+            result = response.json()
+            for changelog in result.get('issueChangeLogs', []):
+                entries = histories.setdefault(str(changelog['issueId']), [])
+                for history in changelog.get('changeHistories', []):
+                    history['created'] = _bulk_timestamp(history['created'])
+                    entries.append(to_namespace(history))
+            if not result.get('nextPageToken'):
+                return histories
+            body = {**body, "nextPageToken": result['nextPageToken']}
+
+    def fetch_comments(self, issueIdOrKey: str, start_at: int, max_results: int,
+                       updated: Optional[str] = None) -> SimpleNamespace:
+        """
+        Fetches a page of comments, oldest first. Like changelog pages, cached pages are reused for as long as the
+        `updated` timestamp of the issue stays the same.
+        """
+        url = f"{self.config.JIRA_SERVER}/rest/api/3/issue/{issueIdOrKey}/comment"
+        params = {"startAt": start_at, "maxResults": max_results, "orderBy": "created"}
+        return to_namespace(self._cached(url, params, lambda: self._get_json(url, params), validator=updated))
+
+    @staticmethod
+    def _plan_comment_pages(issue: SimpleNamespace) -> List[int]:
+        # The search embeds only the first comments of an issue, along with their total
+        embedded = issue.fields.comment
+        return list(range(len(embedded.comments), getattr(embedded, 'total', 0), COMMENTS_PAGE_SIZE))
+
+    @staticmethod
+    def _collect_comments(issue: SimpleNamespace, pages: List[Future]) -> List[Any]:
+        comments = list(issue.fields.comment.comments)
+        if not pages:
+            return comments
+        # Comments added or deleted while paging shift the pages, the same comment may show up twice
+        seen = {getattr(comment, 'id', None) for comment in comments}
+        for page in pages:
+            for comment in page.result().comments:
+                if comment.id not in seen:
+                    seen.add(comment.id)
+                    comments.append(comment)
+        return comments
+
+    @staticmethod
+    def _plan_history_pages(issue: SimpleNamespace) -> List[Tuple[int, int]]:
+        pages = []
+        histories_start_at = 0
+        histories_remaining = issue.changelog.total - len(issue.changelog.histories)
+        while histories_remaining > 0:
+            histories_max_results = min(HISTORIES_PAGE_SIZE, histories_remaining)
+            pages.append((histories_start_at, histories_max_results))
+            histories_start_at += histories_max_results
+            histories_remaining -= histories_max_results
+        return pages
+
+    def _collect_histories(self, issue: SimpleNamespace, prefetched: Dict[Tuple[int, int], Future]) -> List[Any]:
+        # Pages are consumed in the sequential order, a page missing from `prefetched` is fetched in place
         all_histories = issue.changelog.histories
         histories_start_at = 0
         histories_total = issue.changelog.total
@@ -43,9 +242,13 @@ class JiraClient:
                 histories_remaining = histories_total - len(all_histories)
                 if histories_remaining <= 0:
                     break
-                histories_max_results = 100 if histories_remaining > 100 else histories_remaining
-                result = self.fetch_histories(issue.key, start_at=histories_start_at,
-                                              max_results=histories_max_results)
+                histories_max_results = min(HISTORIES_PAGE_SIZE, histories_remaining)
+                page = (histories_start_at, histories_max_results)
+                if page in prefetched:
+                    result = prefetched[page].result()
+                else:
+                    result = self.fetch_histories(issue.key, start_at=histories_start_at,
+                                                  max_results=histories_max_results, updated=issue.fields.updated)
 
                 if not result.values:
                     break
@@ -55,5 +258,13 @@ class JiraClient:
 
                 histories_start_at += histories_max_results
 
-        return sorted(all_histories,
-                      key=lambda x: datetime.strptime(x.created, '%Y-%m-%dT%H:%M:%S.%f%z'))
+        return sorted(all_histories, key=created_at)
+
+
+def _bulk_timestamp(value: Any) -> str:
+    # The bulk endpoint sends epoch milliseconds, the rest of the API and the pipeline use Jira timestamps
+    if isinstance(value, str):
+        return value
+    milliseconds = int(value)
+    moment = datetime.fromtimestamp(milliseconds // 1000, tz=timezone.utc)
+    return f"{moment.strftime('%Y-%m-%dT%H:%M:%S')}.{milliseconds % 1000:03d}+0000"
@@ -0,0 +1,14 @@
+from types import SimpleNamespace
+from typing import Any
+
+
+def to_namespace(value: Any) -> Any:
+    """
+    Turns decoded JSON into nested namespaces that read like jira resources, e.g. `issue.fields.comment.comments`.
+    Unlike resources, nothing is looked up or copied per object, which matters for pages of hundreds of issues.
+    """
+    if type(value) is dict:
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if type(value) is list:
+        return [to_namespace(item) for item in value]
+    return value
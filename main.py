@@ -1,111 +1,634 @@
-import json
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Tuple, Any, Literal
+from __future__ import annotations
+
+import argparse
+import asyncio
+import heapq
+import logging
+from collections import defaultdict, Counter
+from contextlib import closing, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone, date, tzinfo
+from functools import lru_cache
+from itertools import groupby
+from types import SimpleNamespace
+from typing import List, Dict, Set, Tuple, Any, Iterable, Iterator, Optional
 
-import pytz
-from jira import Issue
-
-from gcalendar import gcalendar
 from config.app_config import AppConfig
-from jira_client.jira_client import JiraClient
+from config.app_context import AppContext
+from config.team_roster import load_roster
+from config.work_states import FINISH, START, SWITCH
+from gcalendar.calendar_events import CalendarEventReader
+from jira_client.harvest_state import HarvestState, HARVEST_MARGIN
+from jira_client.issue_snapshot import snapshot_issue
+from jira_client.jira_client import BULK_CHANGELOG_ISSUES
 from models.activity import Activity
-from tempo.tempo_client import TempoClient
+from models.issue_work import IssueWork
+from output.worklog_sinks import WorklogOutput
+from planner import timeline
+from planner.interval_resolver import IntervalResolver
+from storage.plan_file import PlanFile
+from storage.response_cache import ResponseCache
+from storage.state_store import StateStore
+from utils.metrics import RunMetrics, profiling
+from utils.timestamps import created_at, localize, parse_jira_timestamp, to_timezone
+
+logger = logging.getLogger(__name__)
+
+context = AppContext()
+
+def use_context(app_context: AppContext) -> None:
+    """
+    Replaces the configuration and clients the pipeline runs with, e.g. with ones built by the caller.
+    """
+    global context
+    context = app_context
+
+
+def fill_tempo(app_context: Optional[AppContext] = None, resume: bool = False, plan_only: bool = False):
+    """
+    With `resume`, the worklogs planned by the last run are submitted again without fetching anything, skipping
+    the ones the journal knows as created. With `plan_only`, the plan is written but nothing is sent to Tempo.
+    """
+    if app_context is not None:
+        use_context(app_context)
+    ongoing_issues = []
+
+    worklog_from_date, worklog_to_date = get_run_range()
+    submitting = should_submit(plan_only)
+
+    planned = load_plan() if resume else None
+    if planned is None:
+        jira_activities = process_issues(ongoing_issues, from_date=worklog_from_date, to_date=worklog_to_date)
+        calendar_activities = process_calendar_events(worklog_from_date, worklog_to_date)
+        days = emit_plan(plan_worklog_days(jira_activities, calendar_activities, worklog_from_date, worklog_to_date))
+    else:
+        days = emit_plan(group_by_day(planned), save=False)
 
-config = AppConfig()
-jira_client = JiraClient(config)
-tempo_client = TempoClient(config)
-calendar_service = gcalendar.get_calendar_service()
-tz = pytz.timezone(config.RUN_TIMEZONE)
+    tempo_logs = []
+    for _, day_logs in days:
+        # A plan that is not submitted only passes through
+        if submitting:
+            tempo_logs.extend(day_logs)
+    if submitting:
+        submit_tempo_logs(tempo_logs, worklog_from_date, worklog_to_date)
+
+
+def emit_plan(days: Iterable[Tuple[date, List[Activity]]],
+              save: bool = True) -> Iterator[Tuple[date, List[Activity]]]:
+    """
+    Passes the planned days on as they come, after writing each to the configured output and, with `save`, to the
+    plan file. The plan file is only published once every day went through.
+    """
+    config = context.config
+    plan = PlanFile(config.RUN_PLAN_FILE).write(get_plan_run()) if save else nullcontext(lambda day_logs: None)
+    with plan as add_to_plan, closing(WorklogOutput.from_config(config)) as output:
+        for day, day_logs in days:
+            add_to_plan(day_logs)
+            output.write(day, day_logs)
+            yield day, day_logs
+
+
+def group_by_day(tempo_logs: List[Activity]) -> Iterator[Tuple[date, List[Activity]]]:
+    for day, day_logs in groupby(tempo_logs, key=lambda tempo_log: tempo_log.start_time.date()):
+        yield day, list(day_logs)
+
+
+def should_submit(plan_only: bool = False) -> bool:
+    """
+    Tells whether the worklogs of this run go to Tempo, logging why when they don't.
+    """
+    if plan_only:
+        logger.info("Plan only, worklogs are not submitted to Tempo")
+        return False
+    if context.config.CACHE_OFFLINE:
+        logger.info("Offline mode, worklogs are not submitted to Tempo")
+        return False
+    return True
 
 
-def fill_tempo():
+def get_plan_run() -> Dict[str, Any]:
+    """
+    Describes the run a plan belongs to, a plan is only resumed by a run with the same description.
+    """
+    config = context.config
+    return {'start_date': config.RUN_START_DATE, 'end_date': config.RUN_END_DATE, 'timezone': config.RUN_TIMEZONE,
+            'account_id': config.JIRA_ACCOUNT_ID, 'project': config.JIRA_PROJECT}
+
+
+def load_plan() -> Optional[List[Activity]]:
+    plan_file = context.config.RUN_PLAN_FILE
+    tempo_logs = PlanFile(plan_file).load(get_plan_run())
+    if tempo_logs is None:
+        logger.info(f"No complete plan of this run in {plan_file}, planning from scratch")
+    else:
+        logger.info(f"Resuming the plan in {plan_file} with {len(tempo_logs)} worklogs")
+    return tempo_logs
+
+
+def fill_tempo_for_team(app_context: Optional[AppContext] = None, plan_only: bool = False):
+    """
+    Fills the worklogs of every member of the team roster.
+    The project's issues and changelogs are fetched once, attribution and day planning of each member run in a
+    process pool, and the plans are submitted to Tempo one member after another while the rest are planned.
+    With `plan_only`, the plans are only written to the output.
+    """
+    if app_context is not None:
+        use_context(app_context)
+    team_context = context
+    config = team_context.config
+
+    worklog_from_date, worklog_to_date = get_run_range()
+    submitting = should_submit(plan_only)
+    members = load_roster(config.TEAM_ROSTER_FILE)
+    issues = fetch_issue_snapshots([member.account_id for member in members], worklog_from_date, worklog_to_date)
+    logger.info(f"Fetched {len(issues)} issues for {len(members)} team members")
+
+    member_configs = {member.account_id: config.for_member(member.account_id, member.email) for member in members}
+    for member_config in member_configs.values():
+        # Worker processes would write the same state file at once, members plan every day afresh
+        member_config.RUN_INCREMENTAL_DAYS = False
+    calendar_activities = {}
+    try:
+        for member in members:
+            use_context(AppContext(config=member_configs[member.account_id],
+                                   calendar_service=team_context.calendar_service, metrics=team_context.metrics))
+            calendar_activities[member.account_id] = process_calendar_events(worklog_from_date, worklog_to_date)
+    finally:
+        use_context(team_context)
+
+    with ProcessPoolExecutor(max_workers=config.TEAM_WORKERS, initializer=_init_team_worker,
+                             initargs=(issues,)) as planners, ThreadPoolExecutor(max_workers=1) as submissions, \
+            closing(WorklogOutput.from_config(config)) as output:
+        planned = {planners.submit(plan_member_worklogs, member_configs[member.account_id],
+                                   calendar_activities[member.account_id], worklog_from_date, worklog_to_date): member
+                   for member in members}
+        submitted = []
+        for future in as_completed(planned):
+            member = planned[future]
+            tempo_logs, member_metrics = future.result()
+            team_context.metrics.merge(member_metrics)
+            logger.info(f"Planned {len(tempo_logs)} worklogs for {member.email}")
+            for day, day_logs in group_by_day(tempo_logs):
+                output.write(day, day_logs, member.account_id)
+            if not submitting:
+                continue
+            submitted.append(submissions.submit(submit_tempo_logs, tempo_logs, worklog_from_date, worklog_to_date,
+                                                member.account_id))
+        for future in submitted:
+            future.result()
+
+
+def fill_tempo_async(app_context: Optional[AppContext] = None, resume: bool = False, plan_only: bool = False):
+    """
+    Fills Tempo like `fill_tempo`, overlapping the network waits of the stages.
+    The calendar is read while Jira is paged through, the next search page downloads while the current one is
+    attributed, and the worklogs of each resolved day are submitted while the following days are planned.
+    """
+    if app_context is not None:
+        use_context(app_context)
+    if resume and PlanFile(context.config.RUN_PLAN_FILE).load(get_plan_run()) is not None:
+        # Nothing is left to overlap when the plan is already there
+        fill_tempo(resume=True, plan_only=plan_only)
+        return
+    asyncio.run(run_pipeline(plan_only))
+
+
+async def run_pipeline(plan_only: bool = False) -> None:
+    loop = asyncio.get_running_loop()
+    worklog_from_date, worklog_to_date = get_run_range()
+
+    calendar_activities = loop.run_in_executor(None, process_calendar_events, worklog_from_date, worklog_to_date)
+    jira_activities = await process_issues_async(worklog_from_date, worklog_to_date)
+    await plan_and_submit(jira_activities, await calendar_activities, worklog_from_date, worklog_to_date, plan_only)
+
+
+async def process_issues_async(from_date: datetime, to_date: datetime, max_results: int = 100) -> List[Activity]:
+    """
+    `process_issues` with the next search page and its changelogs downloading while the current page is attributed.
+    """
+    loop = asyncio.get_running_loop()
+    issue_work: Dict[str, IssueWork] = dict()
+
+    harvest, updated_since, created_before = plan_issue_search(from_date, to_date)
+    high_water_mark = None
+    pages = search_pages(max_results=max_results, updated_since=updated_since, created_before=created_before)
+    next_page = loop.run_in_executor(None, fetch_issue_page, pages)
+    while True:
+        issues, histories_by_issue, comments_by_issue = await next_page
+        if not issues:
+            break
+        next_page = loop.run_in_executor(None, fetch_issue_page, pages)
+        high_water_mark = attribute_issue_page(issues, histories_by_issue, comments_by_issue, issue_work, [],
+                                               high_water_mark)
+
+    return finish_issue_work(issue_work, harvest, from_date, high_water_mark)
+
+
+async def plan_and_submit(jira_activities: List[Activity], calendar_activities: List[Activity],
+                          worklog_from_date: datetime, worklog_to_date: datetime,
+                          plan_only: bool = False) -> None:
+    """
+    Plans the days one by one and hands the worklogs of each day to the output and a pool of Tempo submitters
+    right away. Reconciliation needs the whole plan to find the worklogs to delete, so it still runs once planning
+    is done.
+    """
+    config = context.config
+    tempo_client = context.tempo_client
+    loop = asyncio.get_running_loop()
+    submitting = should_submit(plan_only)
+    streamed = submitting and config.TEMPO_SYNC_MODE != 'reconcile'
+
+    tempo_logs = []
+    submissions = []
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=config.TEMPO_CONCURRENCY) as submitters:
+        for day, day_logs in emit_plan(plan_worklog_days(jira_activities, calendar_activities, worklog_from_date,
+                                                         worklog_to_date)):
+            if not streamed:
+                if submitting:
+                    tempo_logs.extend(day_logs)
+                continue
+            for tempo_log in day_logs:
+                worklog = tempo_client.build_worklog(tempo_log.id, tempo_log.key, tempo_log.type,
+                                                     tempo_log.start_time, tempo_log.end_time)
+                if tempo_client.journal.get(worklog) is None:
+                    submissions.append(loop.run_in_executor(submitters, tempo_client.submit_worklog, worklog))
+                else:
+                    skipped += 1
+        if skipped:
+            logger.info(f"Skipping {skipped} worklogs already created by a previous run")
+
+        failed = 0
+        with context.metrics.stage('submit'):
+            for done, submission in enumerate(asyncio.as_completed(submissions), start=1):
+                result = await submission
+                failed += 'error' in result
+                logger.info(f"[{done}/{len(submissions)}] {result}")
+        report_failures(failed)
+
+    if submitting and not streamed:
+        submit_tempo_logs(tempo_logs, worklog_from_date, worklog_to_date)
+
+
+def bulk_import(app_context: Optional[AppContext] = None, plan_only: bool = False) -> None:
+    """
+    Backfills a long run range with the bulk endpoints: issues are searched without their changelog, whose entries
+    come from the bulk changelog endpoint for up to `BULK_CHANGELOG_ISSUES` issues at once, and the worklogs are
+    created per issue through Tempo's bulk endpoint. Both are held to the [bulk_import] request rates.
+    Worklogs are always created, those the journal knows as created are skipped.
+    """
+    if app_context is not None:
+        use_context(app_context)
+
+    worklog_from_date, worklog_to_date = get_run_range()
+    submitting = should_submit(plan_only)
+    jira_activities = bulk_process_issues(worklog_from_date, worklog_to_date)
+    calendar_activities = process_calendar_events(worklog_from_date, worklog_to_date)
+    tempo_logs = []
+    for _, day_logs in emit_plan(plan_worklog_days(jira_activities, calendar_activities, worklog_from_date,
+                                                   worklog_to_date)):
+        if submitting:
+            tempo_logs.extend(day_logs)
+
+    if not submitting:
+        return
+    with context.metrics.stage('submit'):
+        results = context.tempo_client.submit_worklogs_bulk(build_worklogs(tempo_logs))
+    report_failures(sum('error' in result for result in results))
+
+
+def bulk_process_issues(from_date: datetime, to_date: datetime, max_results: int = 100) -> List[Activity]:
+    """
+    `process_issues` for a bulk import: search pages are gathered until `BULK_CHANGELOG_ISSUES` issues are at hand,
+    whose changelogs are then fetched together.
+    """
+    jira_client = context.jira_client
+    issue_work: Dict[str, IssueWork] = dict()
     ongoing_issues = []
 
+    pages = search_pages(max_results=max_results, updated_since=from_date - HARVEST_MARGIN,
+                         created_before=to_date + HARVEST_MARGIN, expand_changelog=False)
+    for batch in gather_batches(pages, BULK_CHANGELOG_ISSUES):
+        with context.metrics.stage('fetch_jira'):
+            histories_by_issue, comments_by_issue = jira_client.get_bulk_issue_details(batch)
+        attribute_issue_page(batch, histories_by_issue, comments_by_issue, issue_work, ongoing_issues, None)
+        logger.info(f"Attributed a batch of {len(batch)} issues")
+
+    return finish_issue_work(issue_work, None, from_date, None)
+
+
+def gather_batches(pages: Iterable[List[SimpleNamespace]], size: int) -> Iterator[List[SimpleNamespace]]:
+    """
+    Joins consecutive search pages into batches of at least `size` issues, the last one may be smaller.
+    """
+    batch = []
+    for issues in pages:
+        batch.extend(issues)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_run_range() -> Tuple[datetime, datetime]:
+    config = context.config
+    tz = context.tz
     worklog_from_date = datetime.strptime(config.RUN_START_DATE, '%Y-%m-%d').replace(
         tzinfo=tz)
     worklog_to_date = datetime.strptime(config.RUN_END_DATE, '%Y-%m-%d').replace(
         tzinfo=tz)
+    return worklog_from_date, worklog_to_date
+
+
+def plan_worklogs(jira_activities: List[Activity], calendar_activities: List[Activity],
+                  worklog_from_date: datetime, worklog_to_date: datetime) -> List[Activity]:
+    """
+    Resolves the activities into the worklogs of the run range, in the run timezone.
+    """
+    return [tempo_log for _, day_logs in plan_worklog_days(jira_activities, calendar_activities, worklog_from_date,
+                                                           worklog_to_date)
+            for tempo_log in day_logs]
+
+
+def plan_worklog_days(jira_activities: List[Activity], calendar_activities: List[Activity],
+                      worklog_from_date: datetime, worklog_to_date: datetime) -> Iterator[Tuple[date, List[Activity]]]:
+    """
+    Lazily yields the worklogs of each day of the run range as soon as the day is resolved.
+    """
+    tz = context.tz
+    metrics = context.metrics
+    sorted_activities = heapq.merge(sorted(jira_activities, key=Activity.sort_key),
+                                    sorted(calendar_activities, key=Activity.sort_key),
+                                    key=Activity.sort_key)
+
+    worklog_count = 0
+    dropped_types = Counter()
+
+    for day, adjusted_list in plan_days(sorted_activities, dropped_types):
+        day_logs = []
+        for adjusted in adjusted_list:
+            start_time = adjusted.start_time
+            end_time = adjusted.end_time
+            if start_time >= worklog_from_date and end_time <= worklog_to_date:
+                day_logs.append(adjusted.replace(
+                    start_time=to_timezone(adjusted.start_time, tz),
+                    end_time=to_timezone(adjusted.end_time, tz)
+                ))
+        if day_logs:
+            worklog_count += len(day_logs)
+            yield day, day_logs
+    metrics.count('worklogs', worklog_count)
+    if context.day_state is not None:
+        context.day_state.save()
+
+    if dropped_types:
+        logger.warning(f"Skipped activities whose type is not in priority_order: "
+                       f"{', '.join(f'{act_type} ({count})' for act_type, count in dropped_types.items())}")
+
+
+def submit_tempo_logs(tempo_logs: List[Activity], worklog_from_date: datetime, worklog_to_date: datetime,
+                      account_id: Optional[str] = None) -> None:
+    """
+    Submits the planned worklogs, on behalf of `account_id` when given. Callers check `should_submit` first.
+    """
+    config = context.config
+    tempo_client = context.tempo_client
+    # The day state tracks the days synced for the configured account only
+    day_state = context.day_state if account_id is None else None
+    with context.metrics.stage('submit'):
+        if config.TEMPO_SYNC_MODE == 'reconcile' and day_state is not None:
+            reconcile_dirty_days(tempo_logs, worklog_from_date, worklog_to_date)
+        elif config.TEMPO_SYNC_MODE == 'reconcile':
+            # Planned worklogs end by the start of the end date, Tempo ranges include their last day
+            result = tempo_client.reconcile_worklogs(worklog_from_date, worklog_to_date - timedelta(days=1),
+                                                     build_worklogs(tempo_logs, account_id), account_id=account_id)
+            report_failed_days(result['failed_days'])
+        else:
+            results = tempo_client.submit_worklogs(build_worklogs(tempo_logs, account_id))
+            report_failures(sum('error' in result for result in results))
 
-    jira_activities = process_issues(ongoing_issues)
 
-    calendar_activities = process_calendar_events(worklog_from_date, worklog_to_date)
+def reconcile_dirty_days(tempo_logs: List[Activity], worklog_from_date: datetime, worklog_to_date: datetime) -> None:
+    """
+    Reconciles only the days whose worklogs changed since they were last synced, a run of consecutive days at once.
+    """
+    tempo_client = context.tempo_client
+    day_state = context.day_state
+    dirty_ranges = list(day_state.dirty_ranges(tempo_logs, worklog_from_date, worklog_to_date))
+    logger.info(f"{sum((last_day - first_day).days + 1 for first_day, last_day, _ in dirty_ranges)} days "
+                f"changed since they were last synced")
+    failed_days = []
+    for first_day, last_day, day_logs in dirty_ranges:
+        result = tempo_client.reconcile_worklogs(datetime.combine(first_day, datetime.min.time()),
+                                                 datetime.combine(last_day, datetime.min.time()),
+                                                 build_worklogs(day_logs))
+        failed_days.extend(result['failed_days'])
+        day_state.set_synced(first_day, last_day, day_logs, parse_days(result['failed_days']))
+        day_state.save()
+    report_failed_days(failed_days)
 
-    sorted_activities = sorted(jira_activities + calendar_activities, key=lambda x: x.start_time)
 
-    activity_by_day = organize_activities(sorted_activities)
+def build_worklogs(tempo_logs: List[Activity], account_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    tempo_client = context.tempo_client
+    return [tempo_client.build_worklog(tempo_log.id, tempo_log.key, tempo_log.type, tempo_log.start_time,
+                                       tempo_log.end_time, author_account_id=account_id)
+            for tempo_log in tempo_logs]
 
-    tempo_logs = []
 
-    for day, day_activities in activity_by_day.items():
-        day_start, day_end = get_day_time_bounds(day)
+def report_failures(failed: int) -> None:
+    if failed:
+        logger.warning(f"{failed} worklogs could not be submitted, they are recorded in the journal. "
+                       f"Run again with --resume to retry them without fetching and planning again")
 
-        adjusted_list = []
-        for act_type in config.PRIORITY_ORDER:
-            existing_acts = [a for a in day_activities if a.type == act_type]
-            if existing_acts:
-                for existing in existing_acts:
-                    start_time, end_time = adjust_activity_times(existing, day_start, day_end)
-                    add_to_adjusted(adjusted_list, existing, start_time, end_time)
 
-        for adjusted in adjusted_list:
-            start_time = adjusted.start_time
-            end_time = adjusted.end_time
-            if start_time >= worklog_from_date and end_time <= worklog_to_date:
-                tempo_logs.append(Activity(
-                    id=adjusted.id,
-                    key=adjusted.key,
-                    type=adjusted.type,
-                    start_time=adjusted.start_time.astimezone(tz).isoformat(),
-                    end_time=adjusted.end_time.astimezone(tz).isoformat()
-                ))
+def report_failed_days(failed_days: List[str]) -> None:
+    if failed_days:
+        logger.warning(f"Some worklogs of {', '.join(sorted(failed_days))} could not be synced to Tempo, "
+                       f"these days are synced again by the next run")
 
-    # Result: JSON for Tempo
-    print(json.dumps([activity.to_dict() for activity in tempo_logs], indent=4))
-    for tempo_log in tempo_logs:
-        start_time = tempo_log.start_time
-        end_time = tempo_log.end_time
-        # Define new data to create
-        start_dt = datetime.fromisoformat(start_time)
-        end_dt = datetime.fromisoformat(end_time)
 
-        post_response_json = tempo_client.create_worklog(tempo_log.id, tempo_log.key,
-                                                         tempo_log.type,
-                                                         start_dt, end_dt)
-        print(post_response_json)
+def parse_days(days: Iterable[str]) -> Set[date]:
+    return {date.fromisoformat(day) for day in days}
 
 
-def process_issues(ongoing_issues: List[str] = None, start_at: int = 0, max_results: int = 100) -> List[Activity]:
+def process_issues(ongoing_issues: List[str] = None, start_at: int = 0, max_results: int = 100,
+                   from_date: datetime = None, to_date: datetime = None) -> List[Activity]:
     if ongoing_issues is None:
         ongoing_issues = []
-    issue_work: Dict[str, List[Activity]] = dict()
+    issue_work: Dict[str, IssueWork] = dict()
+
+    harvest, updated_since, created_before = plan_issue_search(from_date, to_date)
+    high_water_mark = None
+    for issues in search_pages(start_at, max_results, updated_since=updated_since, created_before=created_before):
+        histories_by_issue, comments_by_issue = fetch_issue_details(issues)
+        high_water_mark = attribute_issue_page(issues, histories_by_issue, comments_by_issue, issue_work,
+                                               ongoing_issues, high_water_mark)
+
+    return finish_issue_work(issue_work, harvest, from_date, high_water_mark)
+
+
+def plan_issue_search(from_date: Optional[datetime],
+                      to_date: Optional[datetime]) -> Tuple[Optional[HarvestState], Optional[datetime],
+                                                            Optional[datetime]]:
+    """
+    Returns the incremental harvest, if enabled, and the `updated` and `created` bounds of the issue search.
+    """
+    config = context.config
+    harvest = None
+    updated_since = from_date - HARVEST_MARGIN if from_date else None
+    created_before = to_date + HARVEST_MARGIN if to_date else None
+    if config.JIRA_INCREMENTAL and from_date:
+        scope = f"{config.JIRA_PROJECT}:{config.JIRA_ACCOUNT_ID}:{config.JIRA_PARTICIPATION_FILTER}"
+        settings = {
+            'started_work_states': sorted(config.STARTED_WORK_STATES),
+            'finished_work_states': sorted(config.FINISHED_WORK_STATES),
+            'comment_duration_hours': config.COMMENT_DURATION_HOURS
+        }
+        harvest = HarvestState(StateStore(config.RUN_STATE_FILE), scope, settings)
+        updated_since = harvest.updated_since(from_date)
+        # Issues created after this window may carry work for the next one, they must not fall behind the mark
+        created_before = None
+    return harvest, updated_since, created_before
+
+
+def search_pages(start_at: int = 0, max_results: int = 100,
+                 **search_options: Any) -> Iterator[List[SimpleNamespace]]:
+    """
+    Yields the pages of an issue search, see `JiraClient.search_issues` for the options. Jira may cap a page below
+    `max_results`, so every page starts after the issues actually returned and only an empty page ends the search.
+    """
+    jira_client = context.jira_client
     while True:
-        issues = jira_client.search_issues(start_at=start_at, max_results=max_results)
+        with context.metrics.stage('fetch_jira'):
+            issues = jira_client.search_issues(start_at=start_at, max_results=max_results, **search_options)
         if not issues:
-            break
-
+            return
+        yield issues
+        start_at += len(issues)
+
+
+def fetch_issue_details(issues: List[SimpleNamespace]) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+    """
+    Fetches the whole changelogs and all of the comments of a page of issues.
+    """
+    with context.metrics.stage('fetch_jira'):
+        return context.jira_client.get_issue_details(issues)
+
+
+def fetch_issue_page(pages: Iterator[List[SimpleNamespace]]) -> Tuple[List[SimpleNamespace], Dict[str, List[Any]],
+                                                                      Dict[str, List[Any]]]:
+    """
+    Fetches the next page of a search along with the details of its issues, no issues once the search is over.
+    """
+    issues = next(pages, [])
+    if not issues:
+        return [], {}, {}
+    return (issues, *fetch_issue_details(issues))
+
+
+def attribute_issue_page(issues: List[SimpleNamespace], histories_by_issue: Dict[str, List[Any]],
+                         comments_by_issue: Dict[str, List[Any]], issue_work: Dict[str, IssueWork],
+                         ongoing_issues: List[str], high_water_mark: Optional[datetime]) -> Optional[datetime]:
+    """
+    Attributes a page of issues and returns the high-water mark of their `updated` timestamps.
+    """
+    count_issues(issues, histories_by_issue, comments_by_issue)
+    with context.metrics.stage('attribute'):
         for issue in issues:
-            histories = jira_client.get_all_histories(issue)
-            # Process each history in the current batch
-            for history in histories:
-                process_history_items(issue, history, issue_work)
-            update_ongoing_issues(issue, issue_work, ongoing_issues)
-            process_issue_comments(issue, issue_work)
-        start_at += max_results
-    return [item for sublist in issue_work.values() for item in sublist if
-            item.start_time is not None and item.end_time is not None]
+            issue_updated = parse_jira_timestamp(issue.fields.updated)
+            if high_water_mark is None or issue_updated > high_water_mark:
+                high_water_mark = issue_updated
+            attribute_issue(issue, histories_by_issue[issue.key], comments_by_issue[issue.key], issue_work,
+                            ongoing_issues)
+    return high_water_mark
+
+
+def finish_issue_work(issue_work: Dict[str, IssueWork], harvest: Optional[HarvestState],
+                      from_date: Optional[datetime], high_water_mark: Optional[datetime]) -> List[Activity]:
+    completed_work = complete_work(issue_work)
+    if harvest:
+        completed_work = harvest.merge(completed_work, from_date, high_water_mark)
+    activities = [item for sublist in completed_work.values() for item in sublist]
+    context.metrics.count('jira_activities', len(activities))
+    return activities
+
+
+def count_issues(issues: List[SimpleNamespace], histories_by_issue: Dict[str, List[Any]],
+                 comments_by_issue: Dict[str, List[Any]]) -> None:
+    metrics = context.metrics
+    metrics.count('issues', len(issues))
+    metrics.count('changelog_entries', sum(len(histories) for histories in histories_by_issue.values()))
+    metrics.count('comments', sum(len(comments) for comments in comments_by_issue.values()))
+
+
+def fetch_issue_snapshots(account_ids: List[str], from_date: datetime, to_date: datetime,
+                          max_results: int = 100) -> List[SimpleNamespace]:
+    """
+    Fetches the issues of the run range together with their changelogs and comments, once for all the given accounts.
+    """
+    snapshots = []
+    for issues in search_pages(max_results=max_results, updated_since=from_date - HARVEST_MARGIN,
+                               created_before=to_date + HARVEST_MARGIN, account_ids=account_ids):
+        histories_by_issue, comments_by_issue = fetch_issue_details(issues)
+        count_issues(issues, histories_by_issue, comments_by_issue)
+
+        snapshots.extend(snapshot_issue(issue, histories_by_issue[issue.key], comments_by_issue[issue.key])
+                         for issue in issues)
+    return snapshots
+
+
+_team_issues: List[SimpleNamespace] = []
+
+
+def _init_team_worker(issues: List[SimpleNamespace]) -> None:
+    global _team_issues
+    _team_issues = issues
+
+
+def plan_member_worklogs(member_config: AppConfig, calendar_activities: List[Activity],
+                         worklog_from_date: datetime,
+                         worklog_to_date: datetime) -> Tuple[List[Activity], RunMetrics]:
+    """
+    Attributes the shared issues to a team member and plans their worklogs. Runs in a team worker process,
+    the metrics it collected are returned to be merged into those of the run.
+    """
+    use_context(AppContext(config=member_config))
+    metrics = context.metrics
+    issue_work: Dict[str, IssueWork] = dict()
+    with metrics.stage('attribute'):
+        for issue in _team_issues:
+            attribute_issue(issue, issue.histories, issue.fields.comment.comments, issue_work, [])
+    jira_activities = [item for sublist in complete_work(issue_work).values() for item in sublist]
+    metrics.count('jira_activities', len(jira_activities))
+    return plan_worklogs(jira_activities, calendar_activities, worklog_from_date, worklog_to_date), metrics
+
+
+def attribute_issue(issue: SimpleNamespace, histories: List[Any], comments: List[Any], issue_work: Dict[str, IssueWork],
+                    ongoing_issues: List[str]) -> None:
+    # Process each history in the current batch
+    for history in histories:
+        process_history_items(issue, history, issue_work)
+    update_ongoing_issues(issue, issue_work, ongoing_issues)
+    process_issue_comments(issue, issue_work, comments)
+
+
+def complete_work(issue_work: Dict[str, IssueWork]) -> Dict[str, List[Activity]]:
+    return {key: [item for item in works if item.start_time is not None and item.end_time is not None]
+            for key, works in issue_work.items()}
 
 
 def process_calendar_events(calendar_start_date: datetime, calendar_end_date: datetime) -> List[Activity]:
-    calendar_start_datetime = calendar_start_date.isoformat()
-    calendar_end_datetime = calendar_end_date.isoformat()
+    config = context.config
+    calendar_service = context.calendar_service
+    metrics = context.metrics
     calendar_issues = []
 
-    events_result = calendar_service.events().list(calendarId='primary', timeMin=calendar_start_datetime,
-                                                   timeMax=calendar_end_datetime,
-                                                   maxResults=1000, singleEvents=True,
-                                                   orderBy='startTime').execute()
-    events = events_result.get('items', [])
+    store = StateStore(config.RUN_STATE_FILE) if config.GCALENDAR_INCREMENTAL else None
+    event_reader = CalendarEventReader(calendar_service, store, ResponseCache.from_config(config), metrics)
+    with metrics.stage('fetch_calendar'):
+        events = event_reader.list_events(config.GCALENDAR_CALENDAR_IDS, calendar_start_date, calendar_end_date)
+    metrics.count('calendar_events', len(events))
     for event in events:
         if is_invite_accepted(event):
             start = event['start'].get('dateTime', event['start'].get('date'))
@@ -117,18 +640,104 @@ def process_calendar_events(calendar_start_date: datetime, calendar_end_date: da
                 start_time=datetime.fromisoformat(start),
                 end_time=datetime.fromisoformat(end)
             ))
+    metrics.count('meetings', len(calendar_issues))
     return calendar_issues
 
 
-def organize_activities(activities: List[Activity]) -> Dict[datetime.date, List[Activity]]:
-    activity_by_day = defaultdict(list)
+def plan_days(activities: Iterable[Activity], dropped_types: Counter) -> Iterator[Tuple[date, List[Activity]]]:
+    """
+    Lazily yields the resolved activities of each day, consuming activities sorted by start time.
+    Types missing from the priority order are counted in `dropped_types`.
+    """
+    config = context.config
+    metrics = context.metrics
+    if config.RUN_TIMELINE_ENGINE == 'numpy' and not timeline.is_available():
+        logger.warning("numpy is not installed, falling back to the Python timeline engine")
+    if config.RUN_TIMELINE_ENGINE == 'numpy' and timeline.is_available():
+        days = metrics.timed_iter('split', timeline.organize_clipped_activities(list(activities), get_day_time_bounds))
+        for day, day_activities in days:
+            metrics.count('days')
+            with metrics.stage('resolve'):
+                adjusted = resolve_day(day, day_activities, dropped_types, clipped=True)
+            yield day, adjusted
+        return
+
+    for day, day_activities in metrics.timed_iter('split', organize_activities(activities)):
+        metrics.count('days')
+        with metrics.stage('resolve'):
+            adjusted = resolve_day(day, day_activities, dropped_types)
+        yield day, adjusted
+
+
+def resolve_day(day: date, day_activities: List[Activity], dropped_types: Counter,
+                clipped: bool = False) -> List[Activity]:
+    """
+    `plan_day`, reusing the stored resolution of a day whose activity pieces did not change with `incremental_days`.
+    """
+    day_state = context.day_state
+    if day_state is None:
+        return plan_day(day, day_activities, dropped_types, clipped)
+    input_hash = day_state.content_hash(day_activities)
+    adjusted = day_state.get_resolved(day, input_hash, dropped_types)
+    if adjusted is not None:
+        context.metrics.count('days_reused')
+        return adjusted
+    dropped = Counter()
+    adjusted = plan_day(day, day_activities, dropped, clipped)
+    day_state.set_resolved(day, input_hash, adjusted, dropped)
+    dropped_types.update(dropped)
+    return adjusted
+
+
+def plan_day(day: date, day_activities: List[Activity], dropped_types: Counter,
+             clipped: bool = False) -> List[Activity]:
+    """
+    Resolves the overlaps of a day in priority order.
+    `clipped` tells that the activities were already fitted into the workday by the array timeline.
+    """
+    config = context.config
+    day_start, day_end = get_day_time_bounds(day)
+
+    activities_by_type = defaultdict(list)
+    for act in day_activities:
+        activities_by_type[act.type].append(act)
+
+    resolver = IntervalResolver()
+    for act_type in config.PRIORITY_ORDER:
+        for existing in activities_by_type.get(act_type, []):
+            if clipped:
+                start_time, end_time = existing.start_time, existing.end_time
+            else:
+                start_time, end_time = adjust_activity_times(existing, day_start, day_end)
+            resolver.add(existing, start_time, end_time)
+
+    for act_type in activities_by_type.keys() - set(config.PRIORITY_ORDER):
+        dropped_types[act_type] += len(activities_by_type[act_type])
+    return resolver.adjusted
+
+
+def organize_activities(activities: Iterable[Activity]) -> Iterator[Tuple[date, List[Activity]]]:
+    """
+    Groups the day pieces of activities sorted by start time, in ascending order of days.
+    A day is yielded as soon as no later activity can reach it, so only a few days are held at once.
+    """
+    pending_days: Dict[date, List[Activity]] = {}
+    horizon = None
 
-    for act in (broken_act for act in activities for broken_act in break_into_days(act) if
-                broken_act.key != 'Out of office'):
-        day_key = act.start_time.date()
-        activity_by_day[day_key].append(act)
+    for act in activities:
+        # A piece is dated in its own timezone, which never lags more than a day behind UTC
+        act_horizon = act.start_time.astimezone(timezone.utc).date() - timedelta(days=1)
+        if act_horizon != horizon:
+            horizon = act_horizon
+            for day in sorted(day for day in pending_days if day < horizon):
+                yield day, pending_days.pop(day)
 
-    return activity_by_day
+        for broken_act in break_into_days(act):
+            if broken_act.key != 'Out of office':
+                pending_days.setdefault(broken_act.start_time.date(), []).append(broken_act)
+
+    for day in sorted(pending_days):
+        yield day, pending_days[day]
 
 
 def adjust_activity_times(activity: Activity, day_start: datetime, day_end: datetime) -> Tuple[datetime, datetime]:
@@ -145,49 +754,57 @@ def adjust_activity_times(activity: Activity, day_start: datetime, day_end: date
 
 
 def get_day_time_bounds(day: datetime.date) -> Tuple[datetime, datetime]:
-    day_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=config.WORKDAY_START_HOUR)
-    day_start = day_start.replace(tzinfo=tz)
-    day_end = day_start + timedelta(hours=config.WORKDAY_DURATION_HOURS)
-    return day_start, day_end
-
-
-def process_history_items(issue: Issue, history: Any, issue_work: Dict[str, List[Activity]]) -> None:
-    assigned_to_me = is_assigned(history, 'to')
-    assigned_from_me = is_assigned(history, 'from')
-
-    if history.author.accountId == config.JIRA_ACCOUNT_ID or assigned_to_me or assigned_from_me:
-        for item in history.items:
-            if item.field == 'status':
-                add_issue_work(issue_work, issue, item, history, assigned_to_me, assigned_from_me)
-                print(
-                    f"Changelog - {history.created} - Issue: {issue.key}, Field: {item.field}, From: {item.fromString}, To: {item.toString}")
-            elif item.field == 'assignee' and len(history.items) == 1 and assigned_from_me:
-                history_created = datetime.strptime(history.created, '%Y-%m-%dT%H:%M:%S.%f%z')
-                current_issue = issue_work.get(issue.key)
-                if current_issue:
-                    work = find_closest(current_issue, history_created)
-                    if not work.end_time:
-                        work.end_time = history_created
-
-
-def find_closest(activities: List[Activity], target_date: datetime) -> Activity:
-    min_diff = float('inf')
-    closest_element = None
-
-    for element in activities:
-        if element.start_time:
-            start_time = element.start_time
+    config = context.config
+    tz = context.tz
+    return _day_time_bounds(day, tz, config.WORKDAY_START_HOUR, config.WORKDAY_DURATION_HOURS)
 
-            diff = abs((start_time - target_date).total_seconds())
 
-            if diff < min_diff:
-                min_diff = diff
-                closest_element = element
+@lru_cache(maxsize=4096)
+def _day_time_bounds(day: datetime.date, day_tz: tzinfo, start_hour: int,
+                     duration_hours: int) -> Tuple[datetime, datetime]:
+    day_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=start_hour)
+    day_start = localize(day_start, day_tz)
+    day_end = day_start + timedelta(hours=duration_hours)
+    return day_start, day_end
 
-    return closest_element
 
+def process_history_items(issue: SimpleNamespace, history: Any, issue_work: Dict[str, IssueWork]) -> None:
+    config = context.config
+    assigned_to_me, assigned_from_me, status_items = classify_history(history)
 
-def update_ongoing_issues(issue: Any, issue_work: Dict[str, List[Activity]], ongoing_issues: List[str]) -> None:
+    if history.author.accountId == config.JIRA_ACCOUNT_ID or assigned_to_me or assigned_from_me:
+        for item in status_items:
+            add_issue_work(issue_work, issue, item, history, assigned_to_me, assigned_from_me)
+            logger.debug("Changelog - %s - Issue: %s, Field: %s, From: %s, To: %s",
+                         history.created, issue.key, item.field, item.fromString, item.toString)
+        if assigned_from_me and len(history.items) == 1 and history.items[0].field == 'assignee':
+            history_created = created_at(history)
+            current_issue = issue_work.get(issue.key)
+            if current_issue:
+                work = current_issue.find_closest(history_created)
+                if work is not None and not work.end_time:
+                    work.end_time = history_created
+
+
+def classify_history(history: Any) -> Tuple[Optional[bool], Optional[bool], List[Any]]:
+    """
+    Reads the items of a changelog entry once. Returns whether it assigned the issue to and from the account,
+    None for an entry without an assignee change, and its status changes.
+    """
+    account_id = context.config.JIRA_ACCOUNT_ID
+    assigned_to_me = None
+    assigned_from_me = None
+    status_items = []
+    for item in history.items:
+        if item.field == 'status':
+            status_items.append(item)
+        elif item.field == 'assignee':
+            assigned_to_me = assigned_to_me or item.to == account_id
+            assigned_from_me = assigned_from_me or getattr(item, 'from') == account_id
+    return assigned_to_me, assigned_from_me, status_items
+
+
+def update_ongoing_issues(issue: Any, issue_work: Dict[str, IssueWork], ongoing_issues: List[str]) -> None:
     works_by_issue = issue_work.get(issue.key)
     if works_by_issue:
         for work in works_by_issue:
@@ -197,15 +814,16 @@ def update_ongoing_issues(issue: Any, issue_work: Dict[str, List[Activity]], ong
 
 def update_end_time_for_ongoing_issues(issue: Any, work: Activity, ongoing_issues: List[str]) -> None:
     if issue.key in ongoing_issues and work.end_time is None:
-        print("Ongoing issue detected")
-        work.end_time = datetime.now().replace(tzinfo=tz)
+        logger.info("Ongoing issue detected")
+        work.end_time = datetime.now().replace(tzinfo=context.tz)
 
 
-def process_issue_comments(issue: Issue, issue_work: Dict[str, List[Activity]]) -> None:
-    for comment in issue.fields.comment.comments:
+def process_issue_comments(issue: SimpleNamespace, issue_work: Dict[str, IssueWork], comments: List[Any]) -> None:
+    config = context.config
+    for comment in comments:
         if comment.author.accountId == config.JIRA_ACCOUNT_ID:
-            created_time = datetime.strptime(comment.created, '%Y-%m-%dT%H:%M:%S.%f%z')
-            works = issue_work.get(issue.key) or []
+            created_time = created_at(comment)
+            works = issue_work.get(issue.key) or IssueWork()
             works.append(Activity(
                 id=issue.id,
                 key=issue.key,
@@ -213,10 +831,11 @@ def process_issue_comments(issue: Issue, issue_work: Dict[str, List[Activity]])
                 start_time=created_time - timedelta(hours=config.COMMENT_DURATION_HOURS),
                 end_time=created_time
             ))
-            print(f"Comment - {comment.created} - Issue: {issue.key}")
+            logger.debug("Comment - %s - Issue: %s", comment.created, issue.key)
 
 
 def is_invite_accepted(event: Dict[str, Any]) -> bool:
+    config = context.config
     if event['status'] != 'confirmed':
         return False
     for att in event.get('attendees', []):
@@ -274,82 +893,92 @@ def break_into_days(activity: Activity) -> List[Activity]:
         delta_for_day = day_end - start_dt
 
         if delta_for_day.total_seconds() > 0:
-            new_entry = activity.copy()
-            new_entry.start_time = start_dt
-            new_entry.end_time = day_end
-            day_entries.append(new_entry)
+            day_entries.append(activity.replace(start_time=start_dt, end_time=day_end))
         start_dt = day_end
         delta = end_dt - start_dt
 
     return day_entries
 
 
-def is_assigned(history: Any, direction: Literal['from', 'to']) -> bool:
-    result = None
-    for it in history.items:
-        if it.field == 'assignee':
-            if (direction == 'to' and it.to == config.JIRA_ACCOUNT_ID) or (
-                    direction == 'from' and getattr(it, 'from') == config.JIRA_ACCOUNT_ID):
-                return True
-            else:
-                result = False
-    return result
-
-
-def find_index_by_type(arr: List[Activity], type: str) -> int:
-    for idx, x in enumerate(arr):
-        if x.type == type:
-            return idx
-    return -1
+def start_work(works: IssueWork, work_type: str, history: Any, issue: SimpleNamespace) -> None:
+    work = works.find_by_type(work_type)
+    history_creation_date = created_at(history)
+    if work is None:
+        works.append(Activity(id=issue.id, key=issue.key, type=work_type, start_time=history_creation_date))
+    elif work.start_time is None or work.start_time > history_creation_date:
+        works.set_start_time(work, history_creation_date)
+
+
+def close_work(works: IssueWork, work_type: str, history: Any, issue: SimpleNamespace) -> None:
+    work = works.find_by_type(work_type)
+    history_creation_date = created_at(history)
+    if work is None:
+        works.append(Activity(id=issue.id, key=issue.key, type=work_type, end_time=history_creation_date))
+    elif work.end_time is None or work.end_time < history_creation_date:
+        work.end_time = history_creation_date
+
+
+def add_issue_work(issue_work: Dict[str, IssueWork], issue: SimpleNamespace, item: Any, history: Any,
+                   assigned_to_me: bool, assigned_from_me: bool) -> None:
+    transition = context.config.WORK_STATES.classify(item.fromString, item.toString)
+
+    works = issue_work.get(issue.key) or IssueWork()
+    if transition is not None:
+        kind, from_type, to_type = transition
+        if kind == START:
+            start_work(works, to_type, history, issue)
+        elif kind == FINISH:
+            close_work(works, from_type, history, issue)
+        elif kind == SWITCH:
+            if assigned_to_me is True:
+                start_work(works, to_type, history, issue)
+            if assigned_from_me is True:
+                close_work(works, from_type, history, issue)
+            if assigned_to_me is None and assigned_from_me is None:
+                start_work(works, to_type, history, issue)
+                close_work(works, from_type, history, issue)
+    issue_work[issue.key] = works
 
 
-def start_work(works: List[Activity], item: Any, history: Any, issue: Issue) -> None:
-    work_idx = find_index_by_type(works, item.toString)
-    history_creation_date = datetime.strptime(history.created, '%Y-%m-%dT%H:%M:%S.%f%z')
-    if work_idx == -1:
-        work = Activity(id=issue.id, key=issue.key, type=item.toString, start_time=history_creation_date)
-        works.append(work)
-    else:
-        work = works[work_idx]
-        if work.start_time is None or work.start_time > history_creation_date:
-            work.start_time = history_creation_date
-        works[work_idx] = work
-
-
-def close_work(works: List[Activity], item: Any, history: Any, issue: Issue) -> None:
-    work_idx = find_index_by_type(works, item.fromString)
-    history_creation_date = datetime.strptime(history.created, '%Y-%m-%dT%H:%M:%S.%f%z')
-    if work_idx == -1:
-        work = Activity(id=issue.id, key=issue.key, type=item.fromString, end_time=history_creation_date)
-        works.append(work)
-    else:
-        work = works[work_idx]
-        if work.end_time is None or work.end_time < history_creation_date:
-            work.end_time = history_creation_date
-        works[work_idx] = work
-
-
-def add_issue_work(issue_work: Dict[str, List[Activity]], issue: Issue, item: Any, history: Any, assigned_to_me: bool,
-                   assigned_from_me: bool) -> None:
-    started_work = item.toString in config.STARTED_WORK_STATES and item.fromString not in config.STARTED_WORK_STATES
-    finished_work = item.toString in config.FINISHED_WORK_STATES and item.fromString in config.STARTED_WORK_STATES
-    switch_work = item.toString in config.STARTED_WORK_STATES and item.fromString in config.STARTED_WORK_STATES
-
-    works = issue_work.get(issue.key) or []
-    if started_work:
-        start_work(works, item, history, issue)
-    elif finished_work:
-        close_work(works, item, history, issue)
-    elif switch_work:
-        if assigned_to_me is True:
-            start_work(works, item, history, issue)
-        if assigned_from_me is True:
-            close_work(works, item, history, issue)
-        if assigned_to_me is None and assigned_from_me is None:
-            start_work(works, item, history, issue)
-            close_work(works, item, history, issue)
-    issue_work[issue.key] = works
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fills Tempo worklogs from Jira and Google Calendar activity.")
+    parser.add_argument('--team', action='store_true',
+                        help="fill the worklogs of every member of the [team] roster")
+    parser.add_argument('--resume', action='store_true',
+                        help="submit the plan of the last run with the same dates and account, skipping the "
+                             "worklogs already created")
+    parser.add_argument('--plan-only', action='store_true',
+                        help="write the plan without submitting anything to Tempo")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running, syncing Tempo on a schedule and on Jira and Calendar webhooks")
+    parser.add_argument('--bulk-import', action='store_true',
+                        help="backfill a long run range through the Jira and Tempo bulk endpoints")
+    args = parser.parse_args(argv)
+    if args.team and args.resume:
+        parser.error("--resume is not supported with --team, rerunning skips the worklogs already created")
+    if args.daemon and (args.team or args.resume or args.plan_only):
+        parser.error("--daemon cannot be combined with --team, --resume or --plan-only")
+    if args.bulk_import and (args.team or args.resume or args.daemon):
+        parser.error("--bulk-import cannot be combined with --team, --resume or --daemon, rerunning it skips "
+                     "the worklogs already created")
+
+    config = context.config
+    logging.basicConfig(level=config.RUN_LOG_LEVEL, format='%(message)s')
+    with profiling(context.metrics, config.METRICS_PROFILE_FILE, config.METRICS_TRACEMALLOC):
+        if args.daemon:
+            # Imported here, the daemon module reaches the pipeline through this one
+            from daemon.service import run_daemon
+            run_daemon(context)
+        elif args.bulk_import:
+            bulk_import(plan_only=args.plan_only)
+        elif args.team:
+            fill_tempo_for_team(plan_only=args.plan_only)
+        elif config.RUN_PIPELINE == 'async':
+            fill_tempo_async(resume=args.resume, plan_only=args.plan_only)
+        else:
+            fill_tempo(resume=args.resume, plan_only=args.plan_only)
+    context.metrics.write_reports(config.METRICS_REPORT_FILE, config.METRICS_PROMETHEUS_FILE)
 
 
 if __name__ == '__main__':
-    fill_tempo()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,31 +1,74 @@
+import json
+import sys
+from datetime import datetime
+from operator import attrgetter
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _to_iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _from_iso(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
 class Activity:
+    """
+    A span of work on an issue.
+    Large runs create millions of these, so instances are slotted and share their interned key and type strings.
+    Equality and hashing go by value; do not mutate an activity while it sits in a set or dict key.
+    """
+    __slots__ = ('id', 'key', 'type', 'start_time', 'end_time')
+
+    # Key for sorting activities chronologically, e.g. `sorted(activities, key=Activity.sort_key)`
+    sort_key = attrgetter('start_time')
+
     def __init__(self, id, key, type, start_time=None, end_time=None):
         self.id = id
-        self.key = key
-        self.type = type
+        self.key = _intern(key)
+        self.type = _intern(type)
         self.start_time = start_time
         self.end_time = end_time
 
     def to_dict(self):
+        """
+        Returns a JSON-serializable dict, datetimes are rendered in ISO 8601.
+        """
         return {
             "id": self.id,
             "key": self.key,
             "type": self.type,
-            "start_time": self.start_time,
-            "end_time": self.end_time
+            "start_time": _to_iso(self.start_time),
+            "end_time": _to_iso(self.end_time)
         }
 
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
     def copy(self):
         """
         Creates a copy of this Activity instance.
         """
-        return Activity(
-            id=self.id,
-            key=self.key,
-            type=self.type,
-            start_time=self.start_time,
-            end_time=self.end_time
-        )
+        clone = object.__new__(self.__class__)
+        clone.id = self.id
+        clone.key = self.key
+        clone.type = self.type
+        clone.start_time = self.start_time
+        clone.end_time = self.end_time
+        return clone
+
+    def replace(self, **changes):
+        """
+        Creates a copy of this Activity instance with the given fields changed.
+        """
+        clone = self.copy()
+        for name, value in changes.items():
+            setattr(clone, name, _intern(value) if name in ('key', 'type') else value)
+        return clone
 
     @staticmethod
     def from_dict(data):
@@ -33,9 +76,20 @@ class Activity:
             id=data.get("id"),
             key=data.get("key"),
             type=data.get("type"),
-            start_time=data.get("start_time"),
-            end_time=data.get("end_time")
+            start_time=_from_iso(data.get("start_time")),
+            end_time=_from_iso(data.get("end_time"))
         )
 
+    def _fields(self):
+        return self.id, self.key, self.type, self.start_time, self.end_time
+
+    def __eq__(self, other):
+        if not isinstance(other, Activity):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash(self._fields())
+
     def __repr__(self):
         return f"Activity(id={self.id}, key='{self.key}', type='{self.type}', start_time={self.start_time}, end_time={self.end_time})"
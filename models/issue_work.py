@@ -0,0 +1,68 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models.activity import Activity
+
+
+class IssueWork:
+    """
+    The activities found on an issue, in the order they were added.
+    The first activity of each type and the start times are indexed, so status transitions and unassignments
+    find their activity without scanning the whole list. Start times must be changed through `set_start_time`
+    to keep the index in order.
+    """
+
+    def __init__(self) -> None:
+        self.activities: List[Activity] = []
+        self._first_by_type: Dict[str, Activity] = {}
+        # Sorted (start time, position) pairs of the activities that have a start time
+        self._starts: List[Tuple[datetime, int]] = []
+        self._positions: Dict[int, int] = {}
+
+    def __iter__(self) -> Iterator[Activity]:
+        return iter(self.activities)
+
+    def __len__(self) -> int:
+        return len(self.activities)
+
+    def append(self, activity: Activity) -> None:
+        position = len(self.activities)
+        self.activities.append(activity)
+        self._positions[id(activity)] = position
+        self._first_by_type.setdefault(activity.type, activity)
+        if activity.start_time:
+            insort(self._starts, (activity.start_time, position))
+
+    def find_by_type(self, activity_type: str) -> Optional[Activity]:
+        """
+        Returns the first activity of the type, or None.
+        """
+        return self._first_by_type.get(activity_type)
+
+    def set_start_time(self, activity: Activity, start_time: datetime) -> None:
+        position = self._positions[id(activity)]
+        if activity.start_time:
+            del self._starts[bisect_left(self._starts, (activity.start_time, position))]
+        activity.start_time = start_time
+        if start_time:
+            insort(self._starts, (start_time, position))
+
+    def find_closest(self, target_date: datetime) -> Optional[Activity]:
+        """
+        Returns the activity starting closest to the target date, the earliest added one on ties.
+        Activities without a start time are never returned.
+        """
+        after = bisect_right(self._starts, (target_date, len(self.activities)))
+        candidates = []
+        if after > 0:
+            # The earliest added of the activities starting at the latest time not after the target
+            before_start = self._starts[after - 1][0]
+            candidates.append(self._starts[bisect_left(self._starts, (before_start, -1))])
+        if after < len(self._starts):
+            candidates.append(self._starts[after])
+        if not candidates:
+            return None
+
+        _, position = min(candidates, key=lambda start: (abs(start[0] - target_date), start[1]))
+        return self.activities[position]
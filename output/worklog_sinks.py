@@ -0,0 +1,171 @@
+import importlib.util
+import json
+import logging
+import sys
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, Dict, IO, List, Optional
+
+from models.activity import Activity
+
+logger = logging.getLogger(__name__)
+
+# Rows buffered before a Parquet row group is written
+PARQUET_ROW_GROUP_SIZE = 65536
+
+
+def is_parquet_available() -> bool:
+    # pyarrow is optional and slow to import, it is only loaded once a Parquet file is written
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+class WorklogSink(ABC):
+    """
+    Receives the planned worklogs one day at a time, as soon as the day is planned.
+    """
+
+    @abstractmethod
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonSink(WorklogSink):
+    """
+    Logs all worklogs as one indented JSON array once planning is done.
+    """
+
+    def __init__(self) -> None:
+        self.worklogs: List[Dict[str, Any]] = []
+
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        if logger.isEnabledFor(logging.INFO):
+            self.worklogs.extend(_to_dict(worklog, account_id) for worklog in worklogs)
+
+    def close(self) -> None:
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(self.worklogs, indent=4))
+        self.worklogs = []
+
+
+class NdjsonSink(WorklogSink):
+    """
+    Streams one JSON object per worklog to a file, or to standard output.
+    """
+
+    def __init__(self, path: str = '') -> None:
+        self.stream: IO[str] = open(path, 'w') if path else sys.stdout
+
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        self.stream.writelines(json.dumps(_to_dict(worklog, account_id)) + '\n' for worklog in worklogs)
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class SummarySink(WorklogSink):
+    """
+    Logs the number of worklogs and hours of each day, and their totals.
+    """
+
+    def __init__(self) -> None:
+        self.worklog_count = 0
+        self.seconds = 0.0
+
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        seconds = sum((worklog.end_time - worklog.start_time).total_seconds() for worklog in worklogs)
+        self.worklog_count += len(worklogs)
+        self.seconds += seconds
+        owner = f"{account_id} " if account_id else ''
+        logger.info(f"{owner}{day.isoformat()}: {len(worklogs)} worklogs, {seconds / 3600:.2f} h")
+
+    def close(self) -> None:
+        logger.info(f"Total: {self.worklog_count} worklogs, {self.seconds / 3600:.2f} h")
+
+
+class ParquetSink(WorklogSink):
+    """
+    Writes the worklogs to a Parquet file for analysis, one row group per `PARQUET_ROW_GROUP_SIZE` worklogs.
+    """
+
+    def __init__(self, path: str, timezone_name: str) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([
+            ('account_id', pa.string()),
+            ('day', pa.date32()),
+            ('id', pa.string()),
+            ('key', pa.string()),
+            ('type', pa.string()),
+            ('start_time', pa.timestamp('us', tz=timezone_name)),
+            ('end_time', pa.timestamp('us', tz=timezone_name)),
+            ('duration_seconds', pa.int64())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        for worklog in worklogs:
+            self.rows['account_id'].append(account_id)
+            self.rows['day'].append(day)
+            self.rows['id'].append(str(worklog.id))
+            self.rows['key'].append(worklog.key)
+            self.rows['type'].append(worklog.type)
+            self.rows['start_time'].append(worklog.start_time)
+            self.rows['end_time'].append(worklog.end_time)
+            self.rows['duration_seconds'].append(int((worklog.end_time - worklog.start_time).total_seconds()))
+        if len(self.rows['id']) >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.rows['id']:
+            self.writer.write_table(self._pa.Table.from_pydict(self.rows, schema=self.schema))
+            self.rows = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+
+class WorklogOutput(WorklogSink):
+    """
+    Hands the worklogs to every configured sink.
+    """
+
+    def __init__(self, sinks: List[WorklogSink]) -> None:
+        self.sinks = sinks
+
+    @classmethod
+    def from_config(cls, config: Any) -> 'WorklogOutput':
+        sinks: List[WorklogSink] = []
+        if config.OUTPUT_FORMAT == 'json':
+            sinks.append(JsonSink())
+        elif config.OUTPUT_FORMAT == 'ndjson':
+            sinks.append(NdjsonSink(config.OUTPUT_FILE))
+        elif config.OUTPUT_FORMAT == 'summary':
+            sinks.append(SummarySink())
+        if config.OUTPUT_PARQUET_FILE and not is_parquet_available():
+            logger.warning("pyarrow is not installed, the Parquet output is not written")
+        elif config.OUTPUT_PARQUET_FILE:
+            sinks.append(ParquetSink(config.OUTPUT_PARQUET_FILE, config.RUN_TIMEZONE))
+        return cls(sinks)
+
+    def write(self, day: date, worklogs: List[Activity], account_id: Optional[str] = None) -> None:
+        for sink in self.sinks:
+            sink.write(day, worklogs, account_id)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def _to_dict(worklog: Activity, account_id: Optional[str]) -> Dict[str, Any]:
+    data = worklog.to_dict()
+    if account_id:
+        data['account_id'] = account_id
+    return data
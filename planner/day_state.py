@@ -0,0 +1,115 @@
+import hashlib
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.activity import Activity
+from storage.state_store import StateStore
+
+
+class DayState:
+    """
+    Content hashes of the inputs and outputs of every planned day, persisted between runs.
+    A day whose activity pieces hash as they did last time reuses its stored resolution instead of being
+    resolved again, and only the Tempo days whose worklogs changed since they were last synced are dirty.
+    Everything is forgotten when the settings the planner depends on change.
+    """
+
+    def __init__(self, store: StateStore, scope: str, settings: Dict[str, Any]) -> None:
+        self.store = store
+        self.key = f"days:{scope}"
+        self.settings = settings
+        state = store.get(self.key) or {}
+        if state.get('settings') != settings:
+            state = {}
+        # Planner day: hash of the pieces reaching it, their resolution and the types missing from the priorities
+        self.resolved: Dict[str, Dict[str, Any]] = state.get('resolved', {})
+        # Tempo day: hash of the worklogs last synced on it
+        self.synced: Dict[str, str] = state.get('synced', {})
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional['DayState']:
+        if not config.RUN_INCREMENTAL_DAYS:
+            return None
+        settings = {
+            'timezone': config.RUN_TIMEZONE,
+            'timeline_engine': config.RUN_TIMELINE_ENGINE,
+            'priority_order': config.PRIORITY_ORDER,
+            'workday_start_hour': config.WORKDAY_START_HOUR,
+            'workday_duration_hours': config.WORKDAY_DURATION_HOURS
+        }
+        return cls(StateStore(config.RUN_STATE_FILE), f"{config.JIRA_PROJECT}:{config.JIRA_ACCOUNT_ID}", settings)
+
+    @staticmethod
+    def content_hash(activities: Iterable[Activity]) -> str:
+        # Order matters, the resolver keeps the time of the activities placed first
+        digest = hashlib.sha1()
+        for activity in activities:
+            digest.update(f"{activity.id}|{activity.key}|{activity.type}|{activity.start_time.isoformat()}|"
+                          f"{activity.end_time.isoformat()}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_resolved(self, day: date, input_hash: str,
+                     dropped_types: Counter) -> Optional[List[Activity]]:
+        """
+        Returns the stored resolution of the day when its pieces are unchanged, counting its dropped types again.
+        """
+        entry = self.resolved.get(day.isoformat())
+        if entry is None or entry['input'] != input_hash:
+            return None
+        dropped_types.update(entry['dropped'])
+        return [Activity.from_dict(activity) for activity in entry['adjusted']]
+
+    def set_resolved(self, day: date, input_hash: str, adjusted: List[Activity], dropped: Counter) -> None:
+        self.resolved[day.isoformat()] = {
+            'input': input_hash,
+            'adjusted': [activity.to_dict() for activity in adjusted],
+            'dropped': dict(dropped)
+        }
+
+    def dirty_ranges(self, tempo_logs: List[Activity], from_date: datetime,
+                     to_date: datetime) -> Iterator[Tuple[date, date, List[Activity]]]:
+        """
+        Yields the runs of consecutive Tempo days in the range whose worklogs differ from the ones last synced,
+        as first day, last day and the worklogs on them.
+        """
+        logs_by_day: Dict[date, List[Activity]] = {}
+        for tempo_log in tempo_logs:
+            logs_by_day.setdefault(tempo_log.start_time.date(), []).append(tempo_log)
+
+        dirty = [day for day in _days(from_date.date(), to_date.date() - timedelta(days=1))
+                 if self.synced.get(day.isoformat()) != self.content_hash(logs_by_day.get(day, []))]
+
+        run_start = None
+        for index, day in enumerate(dirty):
+            run_start = run_start or day
+            if index + 1 == len(dirty) or dirty[index + 1] != day + timedelta(days=1):
+                yield run_start, day, [tempo_log for run_day in _days(run_start, day)
+                                       for tempo_log in logs_by_day.get(run_day, [])]
+                run_start = None
+
+    def set_synced(self, first_day: date, last_day: date, tempo_logs: List[Activity],
+                   failed_days: Collection[date] = ()) -> None:
+        """
+        Records the worklogs Tempo holds on the given days after a sync.
+        The `failed_days` whose sync did not fully succeed are left dirty, to be synced again by the next run.
+        """
+        logs_by_day: Dict[date, List[Activity]] = {}
+        for tempo_log in tempo_logs:
+            logs_by_day.setdefault(tempo_log.start_time.date(), []).append(tempo_log)
+        for day in _days(first_day, last_day):
+            if day in failed_days:
+                self.synced.pop(day.isoformat(), None)
+            else:
+                self.synced[day.isoformat()] = self.content_hash(logs_by_day.get(day, []))
+
+    def save(self) -> None:
+        self.store.set(self.key, {'settings': self.settings, 'resolved': self.resolved, 'synced': self.synced})
+
+
+def _days(first_day: date, last_day: date) -> Iterator[date]:
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
@@ -0,0 +1,99 @@
+import sys
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import List, Tuple
+
+from models.activity import Activity
+
+
+class IntervalResolver:
+    """
+    Places the activities of a day into slots that do not overlap, activities placed earlier keep their time.
+    Produces the same slots in the same order as repeated `add_to_adjusted` calls, using bisection over the
+    sorted slot bounds instead of rescanning and recursing over the whole list on every insertion.
+    """
+
+    def __init__(self) -> None:
+        self.adjusted: List[Activity] = []
+        # Slots with a positive length are disjoint, so their starts and ends are sorted alike
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        # Zero-length slots still split the activities placed over them later on
+        self._points: List[datetime] = []
+        # Inverted slots break the ordering assumptions, the linear placement takes over once one is kept
+        self._linear = False
+
+    def add(self, existing: Activity, start_time: datetime, end_time: datetime) -> None:
+        if self._linear:
+            self._add_linear(existing, start_time, end_time)
+        elif start_time < end_time:
+            for piece_start, piece_end in self._free_pieces(start_time, end_time):
+                self._place(existing, piece_start, piece_end)
+        elif start_time == end_time:
+            if not self._covers_point(start_time):
+                self._place(existing, start_time, end_time)
+        elif not any(slot.start_time <= start_time and slot.end_time >= end_time for slot in self.adjusted):
+            self._linear = True
+            self._append(existing, start_time, end_time)
+
+    def _free_pieces(self, start_time: datetime, end_time: datetime) -> List[Tuple[datetime, datetime]]:
+        first = bisect_right(self._ends, start_time)
+        last = bisect_left(self._starts, end_time)
+        gaps = []
+        cursor = start_time
+        for idx in range(first, last):
+            if self._starts[idx] > cursor:
+                gaps.append((cursor, self._starts[idx]))
+            cursor = max(cursor, self._ends[idx])
+        if cursor < end_time:
+            gaps.append((cursor, end_time))
+
+        pieces = []
+        for gap_start, gap_end in gaps:
+            for point in self._points[bisect_right(self._points, gap_start):bisect_left(self._points, gap_end)]:
+                pieces.append((gap_start, point))
+                gap_start = point
+            pieces.append((gap_start, gap_end))
+        return pieces
+
+    def _covers_point(self, point: datetime) -> bool:
+        idx = bisect_right(self._starts, point) - 1
+        if idx >= 0 and self._ends[idx] >= point:
+            return True
+        idx = bisect_left(self._points, point)
+        return idx < len(self._points) and self._points[idx] == point
+
+    def _place(self, existing: Activity, start_time: datetime, end_time: datetime) -> None:
+        if start_time == end_time:
+            insort(self._points, start_time)
+        else:
+            idx = bisect_left(self._starts, start_time)
+            self._starts.insert(idx, start_time)
+            self._ends.insert(idx, end_time)
+        self._append(existing, start_time, end_time)
+
+    def _append(self, existing: Activity, start_time: datetime, end_time: datetime) -> None:
+        self.adjusted.append(existing.replace(start_time=start_time, end_time=end_time))
+
+    def _add_linear(self, existing: Activity, start_time: datetime, end_time: datetime) -> None:
+        # Same case analysis as `add_to_adjusted`, with an explicit stack in place of recursion
+        pending = [(start_time, end_time, 0)]
+        while pending:
+            start_time, end_time, depth = pending.pop()
+            if depth > sys.getrecursionlimit():
+                raise RecursionError(f"Could not place {existing} between overlapping inverted slots")
+            for adjusted in self.adjusted:
+                if adjusted.start_time <= start_time < adjusted.end_time < end_time:
+                    pending.append((adjusted.end_time, end_time, depth + 1))
+                    break
+                elif start_time < adjusted.start_time < end_time <= adjusted.end_time:
+                    pending.append((start_time, adjusted.start_time, depth + 1))
+                    break
+                elif start_time < adjusted.start_time and adjusted.end_time < end_time:
+                    pending.append((adjusted.end_time, end_time, depth + 1))
+                    pending.append((start_time, adjusted.start_time, depth + 1))
+                    break
+                elif adjusted.start_time <= start_time and adjusted.end_time >= end_time:
+                    break
+            else:
+                self._append(existing, start_time, end_time)
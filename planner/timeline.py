@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Tuple
+
+from models.activity import Activity
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the Python timeline is used without it
+    np = None
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Timestamps are kept in microseconds, Jira timestamps carry milliseconds that seconds would drop
+DAY = 86400 * 10 ** 6
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+def _to_epoch(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_epoch(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class Timeline:
+    """
+    Array-backed view of activities: int64 epoch start/end arrays with type codes.
+    Mirrors `break_into_days` and `adjust_activity_times` with vectorized operations over all activities at once.
+    """
+
+    def __init__(self, activities: List[Activity]) -> None:
+        self.activities = activities
+        type_codes = {}
+        self.starts = np.fromiter((_to_epoch(act.start_time) for act in activities), dtype=np.int64,
+                                  count=len(activities))
+        self.ends = np.fromiter((_to_epoch(act.end_time) for act in activities), dtype=np.int64,
+                                count=len(activities))
+        # Offset of the start's own timezone, the first day of an activity is taken in it
+        self.offsets = np.fromiter((act.start_time.utcoffset() // timedelta(microseconds=1) for act in activities),
+                                   dtype=np.int64, count=len(activities))
+        self.types = np.fromiter((type_codes.setdefault(act.type, len(type_codes)) for act in activities),
+                                 dtype=np.int32, count=len(activities))
+        self.out_of_office = np.fromiter((act.key == 'Out of office' for act in activities), dtype=bool,
+                                         count=len(activities))
+        self.type_codes = type_codes
+
+    def split_into_days(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Returns the activity index, day number, start and end of every day piece, grouped by day in input order.
+        Weekend pieces are skipped and out of office activities are left out entirely.
+        """
+        first_day = (self.starts + self.offsets) // DAY
+        # Pieces after the first start at UTC midnights, as long as they begin before the activity ends
+        extra_days = np.maximum(-(-self.ends // DAY) - first_day - 1, 0)
+        valid = (self.ends > self.starts) & ~self.out_of_office
+        piece_counts = np.where(valid, extra_days + 1, 0)
+
+        activity_idx = np.repeat(np.arange(len(self.activities)), piece_counts)
+        group_offsets = np.repeat(np.cumsum(piece_counts) - piece_counts, piece_counts)
+        day_offset = np.arange(len(activity_idx)) - group_offsets
+
+        days = first_day[activity_idx] + day_offset
+        starts = np.where(day_offset == 0, self.starts[activity_idx], days * DAY)
+        ends = np.minimum(self.ends[activity_idx], (days + 1) * DAY)
+
+        keep = ((days + EPOCH_WEEKDAY) % 7 < 5) & (ends > starts)
+        order = np.argsort(days[keep], kind='stable')
+        return activity_idx[keep][order], days[keep][order], starts[keep][order], ends[keep][order]
+
+    def clip_to_workday(self, activity_idx: "np.ndarray", days: "np.ndarray", starts: "np.ndarray",
+                        ends: "np.ndarray",
+                        get_day_time_bounds: Callable[[date], Tuple[datetime, datetime]]
+                        ) -> Tuple["np.ndarray", "np.ndarray"]:
+        unique_days, day_positions = np.unique(days, return_inverse=True)
+        bounds = [get_day_time_bounds(date.fromordinal(int(day) + EPOCH_ORDINAL)) for day in unique_days]
+        day_starts = np.array([_to_epoch(day_start) for day_start, _ in bounds], dtype=np.int64)[day_positions]
+        day_ends = np.array([_to_epoch(day_end) for _, day_end in bounds], dtype=np.int64)[day_positions]
+
+        delta = ends - starts
+        clipped_starts = np.maximum(starts, day_starts)
+        clipped_ends = np.minimum(ends, day_ends)
+        clipped_ends = np.where(clipped_ends < day_starts, day_starts + delta, clipped_ends)
+        clipped_starts = np.where(clipped_starts > day_ends, day_ends - delta, clipped_starts)
+
+        meeting_code = self.type_codes.get('Meeting', -1)
+        is_meeting = self.types[activity_idx] == meeting_code
+        return np.where(is_meeting, starts, clipped_starts), np.where(is_meeting, ends, clipped_ends)
+
+
+def organize_clipped_activities(activities: List[Activity],
+                                get_day_time_bounds: Callable[[date], Tuple[datetime, datetime]]
+                                ) -> Iterator[Tuple[date, List[Activity]]]:
+    """
+    Vectorized counterpart of `organize_activities` followed by `adjust_activity_times`.
+    Yields each day with its pieces already clipped to the workday, in ascending order of days.
+    """
+    if not activities:
+        return
+    timeline = Timeline(activities)
+    activity_idx, days, starts, ends = timeline.split_into_days()
+    if not len(days):
+        return
+    clipped_starts, clipped_ends = timeline.clip_to_workday(activity_idx, days, starts, ends, get_day_time_bounds)
+
+    boundaries = np.flatnonzero(np.diff(days)) + 1
+    for first, last in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(days)]))):
+        yield date.fromordinal(int(days[first]) + EPOCH_ORDINAL), [
+            activities[idx].replace(start_time=_from_epoch(start), end_time=_from_epoch(end))
+            for idx, start, end in zip(activity_idx[first:last].tolist(), clipped_starts[first:last].tolist(),
+                                       clipped_ends[first:last].tolist())
+        ]
@@ -0,0 +1,44 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from models.activity import Activity
+
+
+class PlanFile:
+    """
+    JSONL file holding the worklogs planned by a run: a header describing the run, one activity per line and a
+    closing marker. A plan is written to a temporary file and only replaces the previous one once complete,
+    so a resumed run either finds a whole plan or none.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self, run: Dict[str, Any]) -> Optional[List[Activity]]:
+        """
+        Returns the planned activities when the file holds a complete plan of the given run, otherwise None.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as plan_file:
+            lines = [json.loads(line) for line in plan_file if line.strip()]
+        if len(lines) < 2 or lines[0].get('run') != run or not lines[-1].get('complete'):
+            return None
+        return [Activity.from_dict(line) for line in lines[1:-1]]
+
+    @contextmanager
+    def write(self, run: Dict[str, Any]) -> Iterator[Callable[[Iterable[Activity]], None]]:
+        """
+        Yields a function adding activities to the new plan, which is published when the block completes.
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as plan_file:
+            plan_file.write(json.dumps({'run': run, 'created_at': datetime.now(timezone.utc).isoformat()}) + '\n')
+            yield lambda activities: plan_file.writelines(activity.to_json() + '\n' for activity in activities)
+            plan_file.write(json.dumps({'complete': True}) + '\n')
+            plan_file.flush()
+            os.fsync(plan_file.fileno())
+        os.replace(tmp_path, self.path)
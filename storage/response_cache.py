@@ -0,0 +1,104 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    validator TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body TEXT NOT NULL
+)
+"""
+
+
+class CacheMissError(LookupError):
+    """
+    Raised in offline mode when a response was never cached.
+    """
+
+
+class ResponseCache:
+    """
+    Persistent read-through cache of API responses, keyed by endpoint and request parameters.
+    Entries with a validator, such as the `updated` timestamp of an issue, stay valid until it changes;
+    the others expire after `ttl_seconds`. The least recently used entries are evicted above `max_bytes`.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int, offline: bool = False) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional['ResponseCache']:
+        if not config.CACHE_ENABLED and not config.CACHE_OFFLINE:
+            return None
+        return cls(config.CACHE_FILE, config.CACHE_TTL_HOURS * 3600, config.CACHE_MAX_SIZE_MB * 1024 * 1024,
+                   offline=config.CACHE_OFFLINE)
+
+    @staticmethod
+    def _key(namespace: str, endpoint: str, params: Optional[Dict[str, Any]]) -> str:
+        payload = json.dumps([namespace, endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_or_fetch(self, namespace: str, endpoint: str, params: Optional[Dict[str, Any]],
+                     fetch: Callable[[], Any], validator: Optional[str] = None) -> Any:
+        key = self._key(namespace, endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT validator, stored_at, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and (self.offline or self._is_fresh(row, validator, now)):
+                self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+                return json.loads(row[2])
+        if self.offline:
+            raise CacheMissError(f"{endpoint} {params} is not cached and the cache is in offline mode")
+
+        body = fetch()
+        serialized = json.dumps(body)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, validator, stored_at, accessed_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, validator, now, now, len(serialized), serialized))
+            self._evict()
+            self._connection.commit()
+        return body
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE namespace = ?", (namespace,))
+            self._connection.commit()
+
+    def _is_fresh(self, row: Any, validator: Optional[str], now: float) -> bool:
+        stored_validator, stored_at, _ = row
+        if validator is not None:
+            return stored_validator == validator
+        return now - stored_at <= self.ttl_seconds
+
+    def _evict(self) -> None:
+        expired_before = time.time() - self.ttl_seconds
+        self._connection.execute("DELETE FROM responses WHERE validator IS NULL AND stored_at < ?", (expired_before,))
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        rows = self._connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
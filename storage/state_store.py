@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+from typing import Any, Dict
+
+# Stores opened on the same file share a lock, so their read-merge-write cycles never interleave
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def _file_lock(path: str) -> threading.Lock:
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class StateStore:
+    """
+    Small JSON document persisted between runs.
+    Writes go through a temporary file so a crash never leaves a truncated state behind.
+    Every write reads the file again and only changes its own key, so several stores opened on the same file,
+    e.g. by the harvest, the calendar reader and the day state, never put back each other's stale keys.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = _file_lock(path)
+        self._data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as state_file:
+            return json.load(state_file)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data = self._load()
+            self._data[key] = value
+            self._flush()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data = self._load()
+            if self._data.pop(key, None) is not None:
+                self._flush()
+
+    def _flush(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as state_file:
+            json.dump(self._data, state_file)
+        os.replace(tmp_path, self.path)
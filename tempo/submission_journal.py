@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+
+class SubmissionJournal:
+    """
+    Append-only record of the worklogs already created in Tempo, keyed by a fingerprint of their payload.
+    A resumed run looks its worklogs up here and skips the ones that made it to Tempo before.
+    Failed submissions are recorded as well, for the record only; they are retried by the next run.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._worklog_ids: Dict[str, Any] = {}
+        self._fingerprints: Dict[Any, Set[str]] = {}
+        self._load()
+
+    @staticmethod
+    def fingerprint(worklog: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(worklog, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, worklog: Dict[str, Any]) -> Optional[Any]:
+        return self._worklog_ids.get(self.fingerprint(worklog))
+
+    def record_created(self, worklog: Dict[str, Any], worklog_id: Any) -> None:
+        fingerprint = self.fingerprint(worklog)
+        with self._lock:
+            self._remember(fingerprint, worklog_id)
+            self._append({"fingerprint": fingerprint, "tempoWorklogId": worklog_id})
+
+    def record_failed(self, worklog: Dict[str, Any], status: Optional[int], error: str) -> None:
+        with self._lock:
+            self._append({"fingerprint": self.fingerprint(worklog), "failed": status, "error": error})
+
+    def record_deleted(self, worklog_id: Any) -> None:
+        with self._lock:
+            if self._forget(worklog_id):
+                self._append({"tempoWorklogId": worklog_id, "deleted": True})
+
+    def _remember(self, fingerprint: str, worklog_id: Any) -> None:
+        self._worklog_ids[fingerprint] = worklog_id
+        self._fingerprints.setdefault(worklog_id, set()).add(fingerprint)
+
+    def _forget(self, worklog_id: Any) -> bool:
+        fingerprints = self._fingerprints.pop(worklog_id, set())
+        for fingerprint in fingerprints:
+            self._worklog_ids.pop(fingerprint, None)
+        return bool(fingerprints)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as journal_file:
+            for line in journal_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves a partial last line behind
+                    continue
+                if "failed" in entry:
+                    continue
+                if entry.get("deleted"):
+                    self._forget(entry["tempoWorklogId"])
+                else:
+                    self._remember(entry["fingerprint"], entry["tempoWorklogId"])
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with open(self.path, 'a') as journal_file:
+            journal_file.write(json.dumps(entry) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
@@ -1,52 +1,281 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Callable, Set, Tuple, Optional
 
 import requests
 
 from config.app_config import AppConfig
+from storage.response_cache import ResponseCache
+from tempo.submission_journal import SubmissionJournal
+from utils.http_session import RateLimiter, build_session, request_with_backoff
+from utils.metrics import RunMetrics
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Creations are not idempotent, they are only retried when Tempo turned them away without processing them
+CREATE_RETRY_STATUSES = (429, 503)
+WORKLOGS_PAGE_SIZE = 1000
+# Kept small so that a rejected bulk request only fails a few worklogs
+BULK_WORKLOGS_PER_REQUEST = 100
+
+logger = logging.getLogger(__name__)
 
 
 class TempoClient:
-    def __init__(self, config: AppConfig) -> None:
+    def __init__(self, config: AppConfig, metrics: Optional[RunMetrics] = None) -> None:
         self.config = config
+        self.metrics: RunMetrics = metrics if metrics is not None else RunMetrics()
         self.headers: Dict[str, str] = {
             'Authorization': f'Bearer {self.config.TEMPO_API_KEY}',
             'Content-Type': 'application/json'
         }
         self.base_url: str = "https://api.tempo.io/4"
+        self.session: requests.Session = build_session(self.config.TEMPO_CONCURRENCY, headers=self.headers)
+        self.metrics.instrument(self.session, 'tempo')
+        self.journal: SubmissionJournal = SubmissionJournal(self.config.TEMPO_JOURNAL_FILE)
+        self.cache: Optional[ResponseCache] = ResponseCache.from_config(self.config)
+        self.bulk_rate_limiter: RateLimiter = RateLimiter(self.config.BULK_IMPORT_TEMPO_REQUESTS_PER_SECOND)
+
+    def _request(self, method: str, url: str, retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+                 **kwargs: Any) -> requests.Response:
+        return request_with_backoff(self.session, method, url, max_retries=self.config.TEMPO_MAX_RETRIES,
+                                    retry_statuses=retry_statuses, metrics=self.metrics, client='tempo', **kwargs)
 
     def get_worklogs(self, start_date: datetime, end_date: datetime) -> List[str]:
-        url_get: str = f"{self.base_url}/worklogs"
-        params: Dict[str, str] = {
+        return [worklog['tempoWorklogId'] for worklog in self.get_all_worklogs(start_date, end_date)]
+
+    def get_all_worklogs(self, start_date: datetime, end_date: datetime, account_id: Optional[str] = None,
+                         fresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Returns every worklog in the range, following `metadata.next` until the last page.
+        Only the worklogs of `account_id` are returned when it is given. With `fresh`, the pages always come from
+        Tempo rather than the response cache.
+        """
+        url_get: Optional[str] = f"{self.base_url}/worklogs"
+        if account_id is not None:
+            url_get = f"{self.base_url}/worklogs/user/{account_id}"
+        params: Optional[Dict[str, Any]] = {
             "from": start_date.strftime('%Y-%m-%d'),
-            "to": end_date.strftime('%Y-%m-%d')
+            "to": end_date.strftime('%Y-%m-%d'),
+            "limit": WORKLOGS_PAGE_SIZE
         }
-        response: requests.Response = requests.get(url_get, headers=self.headers, params=params)
-        worklogs: Dict[str, Any] = response.json()
-        return [worklog['tempoWorklogId'] for worklog in worklogs['results']]
+        all_worklogs: List[Dict[str, Any]] = []
+        while url_get:
+            worklogs: Dict[str, Any] = self._get_json(url_get, params, fresh=fresh)
+            all_worklogs.extend(worklogs['results'])
+            # The next link already carries the query parameters
+            url_get = worklogs.get('metadata', {}).get('next')
+            params = None
+        return all_worklogs
+
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]], fresh: bool = False) -> Dict[str, Any]:
+        def fetch() -> Dict[str, Any]:
+            response: requests.Response = self._request('GET', url, params=params)
+            response.raise_for_status()
+            return response.json()
 
-    def create_worklog(self, issue_id: str, key: str, work_type: str, start_dt: datetime, end_dt: datetime) -> Dict[str, Any]:
+        if self.cache is None or fresh:
+            return fetch()
+        return self.cache.get_or_fetch('tempo', url, params, fetch)
+
+    def _invalidate_reads(self) -> None:
+        # Cached worklog listings are stale as soon as anything is written
+        if self.cache is not None:
+            self.cache.invalidate('tempo')
+
+    def build_worklog(self, issue_id: str, key: str, work_type: str, start_dt: datetime,
+                      end_dt: datetime, author_account_id: Optional[str] = None) -> Dict[str, Any]:
         date_str: str = start_dt.strftime('%Y-%m-%d')
         time_str: str = start_dt.strftime('%H:%M:%S')
-        new_data: Dict[str, Any] = {
-            "authorAccountId": self.config.JIRA_ACCOUNT_ID,
+        return {
+            "authorAccountId": author_account_id or self.config.JIRA_ACCOUNT_ID,
             "issueId": issue_id,
             "startDate": date_str,
             "startTime": time_str,
             "description": f"{work_type} {key}",
             "timeSpentSeconds": int((end_dt - start_dt).total_seconds())
         }
+
+    def submit_worklogs(self, worklogs: List[Dict[str, Any]], skip_journaled: bool = True) -> List[Dict[str, Any]]:
+        """
+        Creates the given worklogs with a pool of concurrent workers.
+        Worklogs the journal already knows as created are skipped, so an interrupted run can simply be repeated.
+        """
+        pending: List[Dict[str, Any]] = worklogs
+        if skip_journaled:
+            pending = [worklog for worklog in worklogs if self.journal.get(worklog) is None]
+            skipped: int = len(worklogs) - len(pending)
+            if skipped:
+                logger.info(f"Skipping {skipped} worklogs already created by a previous run")
+        return self._run_concurrently(self.submit_worklog, pending, lambda worklog, result: result)
+
+    def submit_worklogs_bulk(self, worklogs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Creates the given worklogs through the bulk endpoint, in requests of up to `BULK_WORKLOGS_PER_REQUEST`
+        worklogs of the same issue sent by a pool of concurrent workers. Worklogs known to the journal are skipped.
+        """
+        pending: List[Dict[str, Any]] = [worklog for worklog in worklogs if self.journal.get(worklog) is None]
+        skipped: int = len(worklogs) - len(pending)
+        if skipped:
+            logger.info(f"Skipping {skipped} worklogs already created by a previous run")
+        worklogs_by_issue: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        for worklog in pending:
+            worklogs_by_issue[worklog['issueId']].append(worklog)
+        chunks: List[Tuple[Any, List[Dict[str, Any]]]] = [
+            (issue_id, issue_worklogs[start:start + BULK_WORKLOGS_PER_REQUEST])
+            for issue_id, issue_worklogs in worklogs_by_issue.items()
+            for start in range(0, len(issue_worklogs), BULK_WORKLOGS_PER_REQUEST)
+        ]
+        results: List[List[Dict[str, Any]]] = self._run_concurrently(
+            lambda chunk: self.submit_worklog_chunk(*chunk), chunks,
+            lambda chunk, result: f"Issue {chunk[0]}: {sum('error' not in item for item in result)} created, "
+                                  f"{sum('error' in item for item in result)} failed")
+        return [item for result in results for item in result]
+
+    def submit_worklog_chunk(self, issue_id: Any, worklogs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Creates worklogs of one issue in a single bulk request and records them in the journal.
+        Tempo creates all of them or none, failures are returned rather than raised.
+        """
+        url_post: str = f"{self.base_url}/worklogs/issue/{issue_id}/bulk"
+        payload: List[Dict[str, Any]] = [{key: value for key, value in worklog.items() if key != "issueId"}
+                                         for worklog in worklogs]
+        try:
+            response: requests.Response = self._request('POST', url_post, retry_statuses=CREATE_RETRY_STATUSES,
+                                                        rate_limiter=self.bulk_rate_limiter, json=payload)
+        except requests.RequestException as error:
+            for worklog in worklogs:
+                self.journal.record_failed(worklog, None, str(error))
+            return [{"status": None, "error": str(error), "worklog": worklog} for worklog in worklogs]
+        finally:
+            self._invalidate_reads()
+        if not response.ok:
+            for worklog in worklogs:
+                self.journal.record_failed(worklog, response.status_code, response.text)
+            return [{"status": response.status_code, "error": response.text, "worklog": worklog}
+                    for worklog in worklogs]
+        created: List[Dict[str, Any]] = response.json()
+        for worklog, result in zip(worklogs, created):
+            self.journal.record_created(worklog, result['tempoWorklogId'])
+        return created
+
+    def _run_concurrently(self, action: Callable[[Any], Any], items: List[Any],
+                          describe: Callable[[Any, Any], Any]) -> List[Any]:
+        with ThreadPoolExecutor(max_workers=self.config.TEMPO_CONCURRENCY) as executor:
+            futures = {executor.submit(action, item): item for item in items}
+            for done, future in enumerate(as_completed(futures), start=1):
+                logger.info(f"[{done}/{len(items)}] {describe(futures[future], future.result())}")
+        return [future.result() for future in futures]
+
+    def submit_worklog(self, worklog: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Creates a single worklog and records it in the journal. Failures are returned rather than raised,
+        including connection errors.
+        """
         url_post: str = f"{self.base_url}/worklogs"
-        post_response: requests.Response = requests.post(url_post, json=new_data, headers=self.headers)
-        return post_response.json()
+        try:
+            response: requests.Response = self._request('POST', url_post, retry_statuses=CREATE_RETRY_STATUSES,
+                                                        json=worklog)
+        except requests.RequestException as error:
+            self.journal.record_failed(worklog, None, str(error))
+            return {"status": None, "error": str(error), "worklog": worklog}
+        finally:
+            self._invalidate_reads()
+        if not response.ok:
+            self.journal.record_failed(worklog, response.status_code, response.text)
+            return {"status": response.status_code, "error": response.text, "worklog": worklog}
+        response_json: Dict[str, Any] = response.json()
+        self.journal.record_created(worklog, response_json['tempoWorklogId'])
+        return response_json
 
-    def delete_worklog(self, worklog_id: str) -> int:
+    def delete_worklog(self, worklog_id: Any) -> Dict[str, Any]:
+        """
+        Deletes a single worklog, one that is already gone counts as deleted.
+        Failures are returned rather than raised, including connection errors.
+        """
         url_delete: str = f"{self.base_url}/worklogs/{worklog_id}"
-        response: requests.Response = requests.delete(url_delete, headers=self.headers)
-        return response.status_code
+        try:
+            response: requests.Response = self._request('DELETE', url_delete)
+        except requests.RequestException as error:
+            return {"status": None, "error": str(error), "worklogId": worklog_id}
+        finally:
+            self._invalidate_reads()
+        if not response.ok and response.status_code != 404:
+            return {"status": response.status_code, "error": response.text, "worklogId": worklog_id}
+        self.journal.record_deleted(worklog_id)
+        return {"status": response.status_code, "worklogId": worklog_id}
+
+    def update_worklog(self, worklog_id: Any, worklog: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Overwrites an existing worklog with the planned one and moves its journal entry along.
+        Failures are returned rather than raised, including connection errors.
+        """
+        url_put: str = f"{self.base_url}/worklogs/{worklog_id}"
+        new_data: Dict[str, Any] = {key: value for key, value in worklog.items() if key != "issueId"}
+        try:
+            response: requests.Response = self._request('PUT', url_put, json=new_data)
+        except requests.RequestException as error:
+            return {"status": None, "error": str(error), "worklog": worklog}
+        finally:
+            self._invalidate_reads()
+        if not response.ok:
+            return {"status": response.status_code, "error": response.text, "worklog": worklog}
+        self.journal.record_deleted(worklog_id)
+        self.journal.record_created(worklog, worklog_id)
+        return response.json()
 
     def remove_worklogs_in_range(self, start_date: datetime, end_date: datetime) -> None:
         worklog_ids: List[str] = self.get_worklogs(start_date, end_date)
-        for worklog_id in worklog_ids:
-            delete_status: int = self.delete_worklog(worklog_id)
-            print(f"Deleted worklog {worklog_id}: Status {delete_status}")
+        self._run_concurrently(self.delete_worklog, worklog_ids,
+                               lambda worklog_id, result: f"Deleted worklog {worklog_id}: Status {result['status']}")
+
+    def reconcile_worklogs(self, start_date: datetime, end_date: datetime,
+                           worklogs: List[Dict[str, Any]], account_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Brings the worklogs of the account in the range in line with the planned ones, by default those of the
+        configured account. Existing worklogs are matched by issue and start, only the differences are written back.
+        Returns the number of worklogs of each change, and the `failed_days` on which a change failed.
+        """
+        existing_by_start: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        # Worklogs changed in Tempo since a cached listing would be overwritten or duplicated, the diff reads fresh
+        for existing in self.get_all_worklogs(start_date, end_date,
+                                              account_id=account_id or self.config.JIRA_ACCOUNT_ID, fresh=True):
+            existing_by_start[self._worklog_index_key(existing['issue']['id'], existing)].append(existing)
+
+        to_create: List[Dict[str, Any]] = []
+        to_update: List[Tuple[Any, Dict[str, Any]]] = []
+        unchanged: int = 0
+        for worklog in worklogs:
+            matches = existing_by_start.get(self._worklog_index_key(worklog['issueId'], worklog))
+            if not matches:
+                to_create.append(worklog)
+                continue
+            existing = matches.pop(0)
+            if (existing['timeSpentSeconds'] == worklog['timeSpentSeconds']
+                    and existing.get('description') == worklog['description']):
+                unchanged += 1
+                if self.journal.get(worklog) is None:
+                    self.journal.record_created(worklog, existing['tempoWorklogId'])
+            else:
+                to_update.append((existing['tempoWorklogId'], worklog))
+        to_delete: Dict[Any, str] = {existing['tempoWorklogId']: existing['startDate']
+                                     for matches in existing_by_start.values() for existing in matches}
+
+        logger.info(f"Reconciling worklogs: {len(to_create)} to create, {len(to_update)} to update, "
+                    f"{len(to_delete)} to delete, {unchanged} unchanged")
+        deleted = self._run_concurrently(self.delete_worklog, list(to_delete),
+                                         lambda worklog_id, result: f"Deleted worklog {worklog_id}: "
+                                                                    f"Status {result['status']}")
+        updated = self._run_concurrently(lambda update: self.update_worklog(*update), to_update,
+                                         lambda update, result: f"Updated worklog {update[0]}: {result}")
+        created = self.submit_worklogs(to_create, skip_journaled=False)
+
+        failed_days: Set[str] = {to_delete[result['worklogId']] for result in deleted if 'error' in result}
+        failed_days.update(result['worklog']['startDate'] for result in updated + created if 'error' in result)
+        return {"created": len(to_create), "updated": len(to_update), "deleted": len(to_delete),
+                "unchanged": unchanged, "failed_days": sorted(failed_days)}
+
+    @staticmethod
+    def _worklog_index_key(issue_id: Any, worklog: Dict[str, Any]) -> Tuple[str, str, str]:
+        return str(issue_id), worklog['startDate'], worklog['startTime']
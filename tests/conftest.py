@@ -0,0 +1,50 @@
+import os
+from typing import Any, Callable
+
+import pytest
+
+import main
+from config.app_config import AppConfig
+from config.app_context import AppContext
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'test.config.ini')
+
+
+@pytest.fixture
+def config_file() -> str:
+    return CONFIG_FILE
+
+
+@pytest.fixture
+def app_config(tmp_path, config_file) -> AppConfig:
+    """
+    The test configuration, with every file a run writes kept in the temporary directory of the test.
+    """
+    config = AppConfig(config_file)
+    config.RUN_STATE_FILE = str(tmp_path / 'state.json')
+    config.RUN_PLAN_FILE = str(tmp_path / 'plan.jsonl')
+    config.TEMPO_JOURNAL_FILE = str(tmp_path / 'journal.jsonl')
+    return config
+
+
+@pytest.fixture
+def use_config(app_config) -> Callable[..., AppConfig]:
+    """
+    Runs the pipeline on the test configuration with the given settings changed, e.g.
+    `use_config(RUN_TIMEZONE='UTC')`. The previous context is restored after the test.
+    """
+    previous = main.context
+
+    def use(**settings: Any) -> AppConfig:
+        for name, value in settings.items():
+            setattr(app_config, name, value)
+        main.use_context(AppContext(config=app_config))
+        return app_config
+
+    yield use
+    main.use_context(previous)
+
+
+@pytest.fixture
+def config(use_config) -> AppConfig:
+    return use_config()
@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from gcalendar.calendar_events import CalendarEventReader
+from storage.state_store import StateStore
+
+TIME_MIN = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TIME_MAX = datetime(2024, 2, 1, tzinfo=timezone.utc)
+PAGE_SIZE = 2
+
+
+class FakeRequest:
+    def __init__(self, execute: Any) -> None:
+        self.execute = execute
+
+
+class FakeCalendarService:
+    """
+    Pages through the events of a single calendar two at a time, like the Calendar API hands out the sync token
+    only with the last page. Every change bumps the version, tokens of `expired` versions answer 410 Gone.
+    """
+
+    def __init__(self, events: List[Dict[str, Any]]) -> None:
+        self.version = 0
+        self.current: Dict[str, Dict[str, Any]] = {event['id']: event for event in events}
+        self.changes: List[tuple] = []
+        self.expired: Set[int] = set()
+        self.failing_status = None
+        self.requests: List[Dict[str, Any]] = []
+
+    def change(self, event: Dict[str, Any]) -> None:
+        self.version += 1
+        if event.get('status') == 'cancelled':
+            self.current.pop(event['id'], None)
+        else:
+            self.current[event['id']] = event
+        self.changes.append((self.version, event))
+
+    def events(self) -> 'FakeCalendarService':
+        return self
+
+    def list(self, **params: Any) -> FakeRequest:
+        self.requests.append(params)
+        return FakeRequest(lambda: self._page(params))
+
+    def _page(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.failing_status is not None:
+            raise HttpError(httplib2.Response({'status': self.failing_status}), b'Backend error')
+        if params.get('syncToken'):
+            since = int(params['syncToken'].split('-')[1])
+            if since in self.expired:
+                raise HttpError(httplib2.Response({'status': 410}), b'Sync token is no longer valid')
+            items = [event for version, event in self.changes if version > since]
+        else:
+            items = list(self.current.values())
+        offset = int(params.get('pageToken') or 0)
+        page = {'items': items[offset:offset + PAGE_SIZE]}
+        if offset + PAGE_SIZE < len(items):
+            page['nextPageToken'] = str(offset + PAGE_SIZE)
+        else:
+            page['nextSyncToken'] = f"sync-{self.version}"
+        return page
+
+
+def event(event_id: str, day: int, summary: str = 'Standup', **extra: Any) -> Dict[str, Any]:
+    return {'id': event_id, 'iCalUID': f"{event_id}@example.com", 'summary': summary,
+            'start': {'dateTime': f"2024-01-{day:02d}T09:00:00+00:00"},
+            'end': {'dateTime': f"2024-01-{day:02d}T09:30:00+00:00"}, **extra}
+
+
+def summaries(events: List[Dict[str, Any]]) -> Dict[str, str]:
+    return {found['id']: found['summary'] for found in events}
+
+
+@pytest.fixture
+def service():
+    return FakeCalendarService([event(f"e{day}", day) for day in range(1, 6)])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / 'state.json'))
+
+
+def test_full_sync_reads_every_page_and_keeps_the_sync_token(service, store):
+    reader = CalendarEventReader(service, store)
+
+    events = reader.list_events(['primary'], TIME_MIN, TIME_MAX)
+
+    assert sorted(summaries(events)) == ['e1', 'e2', 'e3', 'e4', 'e5']
+    assert [request.get('pageToken') for request in service.requests] == [None, '2', '4']
+    assert all('timeMin' in request and 'syncToken' not in request for request in service.requests)
+    assert StateStore(store.path).get(f"calendar:primary:{TIME_MIN.isoformat()}:{TIME_MAX.isoformat()}")[
+        'sync_token'] == 'sync-0'
+
+
+def test_incremental_sync_merges_the_changed_pages(service, store):
+    CalendarEventReader(service, store).list_events(['primary'], TIME_MIN, TIME_MAX)
+    service.change(event('e2', 2, summary='Planning'))
+    service.change({'id': 'e3', 'status': 'cancelled'})
+    service.change(event('e6', 6))
+    service.change(event('e7', 7))
+    service.requests.clear()
+
+    events = CalendarEventReader(service, StateStore(store.path)).list_events(['primary'], TIME_MIN, TIME_MAX)
+
+    assert summaries(events) == summaries(list(service.current.values()))
+    assert summaries(events)['e2'] == 'Planning'
+    assert [request.get('pageToken') for request in service.requests] == [None, '2']
+    assert all(request['syncToken'] == 'sync-0' and 'timeMin' not in request for request in service.requests)
+
+
+def test_expired_sync_token_falls_back_to_a_full_sync(service, store):
+    CalendarEventReader(service, store).list_events(['primary'], TIME_MIN, TIME_MAX)
+    service.change({'id': 'e1', 'status': 'cancelled'})
+    service.change(event('e8', 8))
+    service.expired.add(0)
+    service.requests.clear()
+
+    reader = CalendarEventReader(service, StateStore(store.path))
+    events = reader.list_events(['primary'], TIME_MIN, TIME_MAX)
+
+    assert sorted(summaries(events)) == ['e2', 'e3', 'e4', 'e5', 'e8']
+    assert service.requests[0]['syncToken'] == 'sync-0'
+    assert all('timeMin' in request for request in service.requests[1:])
+    service.requests.clear()
+    assert sorted(summaries(reader.list_events(['primary'], TIME_MIN, TIME_MAX))) == ['e2', 'e3', 'e4', 'e5', 'e8']
+    assert [request.get('syncToken') for request in service.requests] == ['sync-2']
+
+
+def test_other_errors_of_an_incremental_sync_are_raised(service, store):
+    CalendarEventReader(service, store).list_events(['primary'], TIME_MIN, TIME_MAX)
+    service.failing_status = 500
+
+    with pytest.raises(HttpError):
+        CalendarEventReader(service, StateStore(store.path)).list_events(['primary'], TIME_MIN, TIME_MAX)
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import pytest
+
+from main import add_to_adjusted
+from models.activity import Activity
+from planner.interval_resolver import IntervalResolver
+
+DAY_START = datetime(2024, 1, 8, 9, tzinfo=timezone.utc)
+CASES = 5000
+
+Slot = Tuple[int, int]
+
+
+def at(minutes: int) -> datetime:
+    return DAY_START + timedelta(minutes=minutes)
+
+
+def activity(index: int) -> Activity:
+    return Activity(id=str(index), key=f"SYN-{index}", type='Implement')
+
+
+def as_slots(adjusted: List[Activity]) -> List[Tuple[str, datetime, datetime]]:
+    return [(item.key, item.start_time, item.end_time) for item in adjusted]
+
+
+def place_with_reference(slots: List[Slot]) -> Optional[List[Tuple[str, datetime, datetime]]]:
+    adjusted: List[Activity] = []
+    try:
+        for index, (start, end) in enumerate(slots):
+            add_to_adjusted(adjusted, activity(index), at(start), at(end))
+    except RecursionError:
+        return None
+    return as_slots(adjusted)
+
+
+def place_with_resolver(slots: List[Slot]) -> Optional[List[Tuple[str, datetime, datetime]]]:
+    resolver = IntervalResolver()
+    try:
+        for index, (start, end) in enumerate(slots):
+            resolver.add(activity(index), at(start), at(end))
+    except RecursionError:
+        return None
+    return as_slots(resolver.adjusted)
+
+
+def random_slots(rng: random.Random) -> List[Slot]:
+    # A coarse grid makes touching, nested and identical slots frequent
+    grid = rng.choice([4, 8, 30])
+    slots = []
+    for _ in range(rng.randint(1, 12)):
+        start = rng.randint(0, grid) * 15
+        shape = rng.random()
+        if shape < 0.1:
+            end = start
+        elif shape < 0.15:
+            end = start - rng.randint(1, 4) * 15
+        else:
+            end = start + rng.randint(1, grid) * 15
+        slots.append((start, end))
+    return slots
+
+
+@pytest.mark.parametrize('slots', [
+    [],
+    [(0, 60)],
+    [(0, 60), (60, 120), (30, 90)],
+    [(0, 60), (0, 60), (15, 45)],
+    [(30, 30), (0, 60)],
+    [(30, 30), (30, 30), (0, 60), (30, 30)],
+    [(0, 60), (60, 60), (0, 120)],
+    [(0, 30), (60, 90), (120, 150), (0, 180)],
+    [(60, 30), (0, 120)],
+    [(60, 30), (60, 30), (45, 45)],
+])
+def test_resolver_matches_reference_on_edge_cases(slots):
+    assert place_with_resolver(slots) == place_with_reference(slots)
+
+
+def test_inverted_slot_that_never_resolves_raises_recursion_error():
+    slots = [(600, 300), (360, 720)]
+
+    assert place_with_reference(slots) is None
+    with pytest.raises(RecursionError):
+        resolver = IntervalResolver()
+        for index, (start, end) in enumerate(slots):
+            resolver.add(activity(index), at(start), at(end))
+
+
+def test_resolver_matches_reference_on_random_days():
+    rng = random.Random(20240108)
+    for _ in range(CASES):
+        slots = random_slots(rng)
+        assert place_with_resolver(slots) == place_with_reference(slots), slots
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, List
+
+import pytest
+
+import main
+from benchmarks.fakes import FakeJiraClient
+from benchmarks.synthetic import generate_dataset
+from config.app_context import AppContext
+
+FROM_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TO_DATE = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+class CappedJiraClient(FakeJiraClient):
+    """
+    Answers every search with at most `cap` issues, whatever `max_results` asks for, like Jira does under load.
+    """
+
+    def __init__(self, dataset: Any, cap: int) -> None:
+        super().__init__(dataset)
+        self.cap = cap
+
+    def search_issues(self, start_at: int, max_results: int, **search_options: Any) -> List[Any]:
+        return super().search_issues(start_at, min(max_results, self.cap))
+
+
+@pytest.fixture
+def dataset():
+    return generate_dataset(seed=5, users=1, months=1, issues=45)
+
+
+@pytest.fixture
+def use_jira(config, dataset):
+    config.JIRA_ACCOUNT_ID = dataset.account_ids[0]
+
+    def use(jira_client: FakeJiraClient) -> None:
+        main.use_context(AppContext(config=config, jira_client=jira_client))
+    return use
+
+
+def activities(found: List[Any]) -> List[dict]:
+    return sorted((activity.to_dict() for activity in found), key=lambda activity: sorted(activity.items()))
+
+
+def test_search_pages_follow_the_issues_actually_returned(dataset, use_jira):
+    use_jira(CappedJiraClient(dataset, cap=7))
+
+    pages = list(main.search_pages(max_results=20))
+
+    assert [len(issues) for issues in pages] == [7] * 6 + [3]
+    assert [issue.key for issues in pages for issue in issues] == [issue.key for issue, _ in dataset.issues]
+
+
+def test_capped_pages_attribute_the_same_work(dataset, use_jira):
+    use_jira(FakeJiraClient(dataset))
+    expected = activities(main.process_issues([], from_date=FROM_DATE, to_date=TO_DATE))
+    assert expected
+    snapshots = [issue.key for issue in main.fetch_issue_snapshots(['test-account'], FROM_DATE, TO_DATE)]
+
+    use_jira(CappedJiraClient(dataset, cap=7))
+
+    assert activities(main.process_issues([], from_date=FROM_DATE, to_date=TO_DATE)) == expected
+    assert activities(asyncio.run(main.process_issues_async(FROM_DATE, TO_DATE))) == expected
+    assert [issue.key for issue in main.fetch_issue_snapshots(['test-account'], FROM_DATE, TO_DATE)] == snapshots
+    assert len(snapshots) == len(dataset.issues)
+
+
+def test_gather_batches_joins_pages_up_to_the_batch_size():
+    pages = [[1, 2, 3], [4, 5], [6, 7, 8], [9]]
+
+    assert list(main.gather_batches(iter(pages), 4)) == [[1, 2, 3, 4, 5], [6, 7, 8, 9]]
+    assert list(main.gather_batches(iter(pages), 100)) == [[1, 2, 3, 4, 5, 6, 7, 8, 9]]
+    assert list(main.gather_batches(iter([]), 4)) == []
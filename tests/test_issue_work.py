@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from models.activity import Activity
+from models.issue_work import IssueWork
+
+BASE = datetime(2024, 1, 8, 9, tzinfo=timezone.utc)
+
+
+def at(hours: float) -> datetime:
+    return BASE + timedelta(hours=hours)
+
+
+def work(work_type: str, start_hours=None, end_hours=None, key: str = 'SYN-1') -> Activity:
+    return Activity(id='1', key=key, type=work_type,
+                    start_time=at(start_hours) if start_hours is not None else None,
+                    end_time=at(end_hours) if end_hours is not None else None)
+
+
+def issue_work_of(*activities: Activity) -> IssueWork:
+    works = IssueWork()
+    for activity in activities:
+        works.append(activity)
+    return works
+
+
+def test_find_by_type_returns_the_first_activity_of_the_type():
+    first_review = work('Review', 0)
+    works = issue_work_of(work('Implement', 1), first_review, work('Review', 2))
+
+    assert works.find_by_type('Review') is first_review
+    assert works.find_by_type('Discuss / Design') is None
+
+
+def test_find_closest_returns_the_nearest_start():
+    works = issue_work_of(work('Review', 0), work('Implement', 5), work('Comment', 9))
+
+    assert works.find_closest(at(4)).type == 'Implement'
+    assert works.find_closest(at(8)).type == 'Comment'
+    assert works.find_closest(at(-3)).type == 'Review'
+
+
+def test_find_closest_breaks_ties_by_the_earliest_added():
+    later_added = work('Review', 0)
+    earlier_added = work('Implement', 4)
+    works = issue_work_of(earlier_added, later_added)
+
+    # Equally far before and after the target
+    assert works.find_closest(at(2)) is earlier_added
+
+    first_same_start = work('Implement', 6)
+    works = issue_work_of(first_same_start, work('Review', 6), work('Comment', 6))
+    assert works.find_closest(at(5)) is first_same_start
+    assert works.find_closest(at(7)) is first_same_start
+
+
+def test_find_closest_skips_activities_without_a_start_time():
+    assert issue_work_of(work('Review', end_hours=3)).find_closest(at(3)) is None
+    assert IssueWork().find_closest(at(0)) is None
+
+
+def test_set_start_time_reindexes_the_activity():
+    moved = work('Review', end_hours=8)
+    stays = work('Implement', 4)
+    works = issue_work_of(moved, stays)
+    assert works.find_closest(at(0)) is stays
+
+    works.set_start_time(moved, at(0))
+    assert moved.start_time == at(0)
+    assert works.find_closest(at(1)) is moved
+
+    works.set_start_time(moved, at(10))
+    assert works.find_closest(at(1)) is stays
+    assert works.find_closest(at(9)) is moved
+
+
+def history(created: datetime, author: str, *items: SimpleNamespace) -> SimpleNamespace:
+    return SimpleNamespace(created=created.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+                           author=SimpleNamespace(accountId=author), items=list(items))
+
+
+def unassign(account_id: str) -> SimpleNamespace:
+    return SimpleNamespace(field='assignee', to='someone-else', fromString=None, toString=None,
+                           **{'from': account_id})
+
+
+def test_unassign_closes_the_activity_started_closest(config):
+    issue = SimpleNamespace(id='1', key='SYN-1')
+    open_work = work('Review', 0)
+    issue_work = {issue.key: issue_work_of(work('Implement', -5, -4), open_work)}
+
+    main.process_history_items(issue, history(at(2), 'someone-else', unassign(config.JIRA_ACCOUNT_ID)), issue_work)
+
+    assert open_work.end_time == at(2)
+
+
+def test_unassign_with_no_started_activity_is_skipped(config):
+    issue = SimpleNamespace(id='1', key='SYN-1')
+    unstarted = work('Review', end_hours=3)
+    issue_work = {issue.key: issue_work_of(unstarted)}
+
+    main.process_history_items(issue, history(at(2), 'someone-else', unassign(config.JIRA_ACCOUNT_ID)), issue_work)
+
+    assert unstarted.start_time is None
+    assert unstarted.end_time == at(3)
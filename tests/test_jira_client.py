@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from config.app_config import AppConfig
+from jira_client.jira_client import JiraClient
+
+
+class FakeResponse:
+    def __init__(self, payload: Any, status_code: int = 200) -> None:
+        self.payload = payload
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+
+    def json(self) -> Any:
+        return self.payload
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise AssertionError(f"unexpected status {self.status_code}")
+
+
+class FakeJiraSession:
+    """
+    Serves the changelog and comment pages of issues, answering later pages first so concurrent fetches complete
+    out of order.
+    """
+
+    def __init__(self, histories: Dict[str, List[dict]], comments: Dict[str, List[dict]]) -> None:
+        self.histories = histories
+        self.comments = comments
+        self.requested: List[tuple] = []
+        self.lock = threading.Lock()
+
+    def request(self, method: str, url: str, params: Dict[str, Any], **kwargs: Any) -> FakeResponse:
+        key, resource = re.search(r'/issue/([^/]+)/(changelog|comment)$', url).groups()
+        start_at, max_results = params['startAt'], params['maxResults']
+        with self.lock:
+            self.requested.append((key, resource, start_at, max_results))
+        time.sleep(0.02 / (1 + start_at / 100))
+        if resource == 'changelog':
+            return FakeResponse({"values": self.histories[key][start_at:start_at + max_results]})
+        return FakeResponse({"comments": self.comments[key][start_at:start_at + max_results]})
+
+
+def history(index: int) -> dict:
+    return {"id": str(index), "created": f"2024-01-{1 + index // 100:02d}T{(index % 100) // 10:02d}:"
+                                         f"{index % 10:02d}:00.000+0000", "items": []}
+
+
+def comment(index: int) -> dict:
+    return {"id": str(index), "created": f"2024-02-01T00:00:{index % 60:02d}.000+0000"}
+
+
+def issue(key: str, histories: List[dict], embedded_histories: int, comments: List[dict],
+          embedded_comments: int) -> SimpleNamespace:
+    # A fresh issue every time, collecting the changelog extends the embedded histories in place
+    return SimpleNamespace(
+        key=key,
+        fields=SimpleNamespace(
+            updated='2024-03-01T00:00:00.000+0000',
+            comment=SimpleNamespace(comments=[SimpleNamespace(**c) for c in comments[:embedded_comments]],
+                                    total=len(comments))),
+        changelog=SimpleNamespace(histories=[SimpleNamespace(**h) for h in histories[:embedded_histories]],
+                                  total=len(histories)))
+
+
+@pytest.fixture
+def pages():
+    histories = {'SYN-1': [history(i) for i in range(350)], 'SYN-2': [history(i) for i in range(40)],
+                 'SYN-3': [history(i) for i in range(120)]}
+    comments = {'SYN-1': [comment(i) for i in range(230)], 'SYN-2': [comment(i) for i in range(3)],
+                'SYN-3': [comment(i) for i in range(101)]}
+
+    def issues() -> List[SimpleNamespace]:
+        return [issue('SYN-1', histories['SYN-1'], 20, comments['SYN-1'], 5),
+                issue('SYN-2', histories['SYN-2'], 40, comments['SYN-2'], 3),
+                issue('SYN-3', histories['SYN-3'], 100, comments['SYN-3'], 1)]
+
+    return histories, comments, issues
+
+
+def client_with(app_config: AppConfig, session: FakeJiraSession) -> JiraClient:
+    client = JiraClient(app_config)
+    client.session = session
+    return client
+
+
+def ids(records: List[Any]) -> List[str]:
+    return [record.id for record in records]
+
+
+def test_concurrent_changelog_pages_match_the_sequential_fetch(app_config, pages):
+    histories, comments, issues = pages
+    sequential = client_with(app_config, FakeJiraSession(histories, comments))
+    expected = {found.key: ids(sequential.get_all_histories(found)) for found in issues()}
+
+    session = FakeJiraSession(histories, comments)
+    fetched_histories, _ = client_with(app_config, session).get_issue_details(issues())
+
+    assert {key: ids(found) for key, found in fetched_histories.items()} == expected
+    for found in fetched_histories.values():
+        assert [h.created for h in found] == sorted(h.created for h in found)
+    changelog_requests = [request for request in session.requested if request[1] == 'changelog']
+    assert len(changelog_requests) == len(set(changelog_requests))
+    assert {request[0] for request in changelog_requests} == {'SYN-1', 'SYN-3'}
+
+
+def test_concurrent_comment_pages_are_complete_and_in_order(app_config, pages):
+    histories, comments, issues = pages
+    session = FakeJiraSession(histories, comments)
+
+    _, fetched_comments = client_with(app_config, session).get_issue_details(issues())
+
+    assert {key: ids(found) for key, found in fetched_comments.items()} == {
+        key: [c['id'] for c in all_comments] for key, all_comments in comments.items()}
+    comment_requests = sorted(request[2] for request in session.requested
+                              if request[0] == 'SYN-1' and request[1] == 'comment')
+    assert comment_requests == [5, 105, 205]
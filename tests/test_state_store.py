@@ -0,0 +1,26 @@
+from storage.state_store import StateStore
+
+
+def test_stores_on_the_same_file_keep_each_others_keys(tmp_path):
+    path = str(tmp_path / 'state.json')
+    harvest_store = StateStore(path)
+    calendar_store = StateStore(path)
+
+    harvest_store.set('harvest', {'high_water_mark': '2024-01-08T09:00:00+00:00'})
+    calendar_store.set('calendar', {'sync_token': 'token-1'})
+
+    assert StateStore(path).get('harvest') == {'high_water_mark': '2024-01-08T09:00:00+00:00'}
+    assert StateStore(path).get('calendar') == {'sync_token': 'token-1'}
+
+
+def test_a_long_lived_store_does_not_put_back_stale_keys(tmp_path):
+    path = str(tmp_path / 'state.json')
+    long_lived = StateStore(path)
+    long_lived.set('days', {'resolved': {}})
+    StateStore(path).set('calendar', {'sync_token': 'token-2'})
+
+    long_lived.set('days', {'resolved': {'2024-01-08': 'hash'}})
+    long_lived.delete('missing')
+
+    assert StateStore(path).get('calendar') == {'sync_token': 'token-2'}
+    assert StateStore(path).get('days') == {'resolved': {'2024-01-08': 'hash'}}
@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pytest
+import requests
+
+from tempo.tempo_client import TempoClient
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 31)
+
+
+class FakeResponse:
+    def __init__(self, payload: Any = None, status_code: int = 200) -> None:
+        self.payload = payload
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self.text = '' if status_code < 400 else f"status {status_code}"
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self) -> Any:
+        return self.payload
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(self.text)
+
+
+class FakeTempoSession:
+    """
+    Keeps worklogs like Tempo does, requests to the worklog ids in `broken` fail with a connection error.
+    """
+
+    def __init__(self, worklogs: List[Dict[str, Any]], broken: Optional[set] = None) -> None:
+        self.worklogs = {worklog['tempoWorklogId']: worklog for worklog in worklogs}
+        self.broken = broken or set()
+        self.next_id = 1000
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                json: Any = None, **kwargs: Any) -> FakeResponse:
+        worklog_id = url.rsplit('/', 1)[-1]
+        if method == 'GET':
+            return FakeResponse({"results": list(self.worklogs.values()), "metadata": {}})
+        if worklog_id.isdigit() and int(worklog_id) in self.broken:
+            raise requests.ConnectionError(f"connection reset while sending {method} {worklog_id}")
+        if method == 'DELETE':
+            return FakeResponse(status_code=204 if self.worklogs.pop(int(worklog_id), None) else 404)
+        if method == 'PUT':
+            self.worklogs[int(worklog_id)].update(json)
+            return FakeResponse(self.worklogs[int(worklog_id)])
+        self.next_id += 1
+        self.worklogs[self.next_id] = {**json, "tempoWorklogId": self.next_id, "issue": {"id": json['issueId']}}
+        return FakeResponse(self.worklogs[self.next_id])
+
+
+def existing(worklog_id: int, issue_id: str, start_date: str, seconds: int = 3600) -> Dict[str, Any]:
+    return {"tempoWorklogId": worklog_id, "issue": {"id": issue_id}, "startDate": start_date,
+            "startTime": '09:00:00', "timeSpentSeconds": seconds, "description": f"Review SYN-{issue_id}"}
+
+
+def planned(issue_id: str, start_date: str, seconds: int = 3600) -> Dict[str, Any]:
+    return {"authorAccountId": 'test-account', "issueId": issue_id, "startDate": start_date,
+            "startTime": '09:00:00', "description": f"Review SYN-{issue_id}", "timeSpentSeconds": seconds}
+
+
+@pytest.fixture
+def tempo_client(app_config):
+    app_config.TEMPO_MAX_RETRIES = 0
+    return TempoClient(app_config)
+
+
+def test_reconcile_reports_the_days_of_failed_deletes_and_updates(tempo_client):
+    tempo_client.session = FakeTempoSession([
+        existing(1, '10', '2024-01-08'), existing(2, '11', '2024-01-09'),
+        existing(3, '12', '2024-01-10'), existing(4, '13', '2024-01-11')], broken={1, 3})
+
+    result = tempo_client.reconcile_worklogs(START, END, [
+        planned('12', '2024-01-10', seconds=7200), planned('13', '2024-01-11', seconds=7200)])
+
+    assert result['deleted'] == 2 and result['updated'] == 2
+    assert result['failed_days'] == ['2024-01-08', '2024-01-10']
+    assert sorted(tempo_client.session.worklogs) == [1, 3, 4]
+    assert tempo_client.session.worklogs[4]['timeSpentSeconds'] == 7200
+
+
+def test_delete_and_update_return_connection_errors(tempo_client):
+    tempo_client.session = FakeTempoSession([existing(1, '10', '2024-01-08')], broken={1})
+
+    deleted = tempo_client.delete_worklog(1)
+    updated = tempo_client.update_worklog(1, planned('10', '2024-01-08'))
+
+    assert deleted['status'] is None and 'connection reset' in deleted['error']
+    assert updated['status'] is None and updated['worklog']['issueId'] == '10'
+    assert tempo_client.delete_worklog(2) == {"status": 404, "worklogId": 2}
+
+
+def test_reconcile_diffs_against_fresh_worklogs_despite_the_cache(app_config, tmp_path):
+    app_config.CACHE_ENABLED = True
+    app_config.CACHE_FILE = str(tmp_path / 'cache.sqlite')
+    tempo_client = TempoClient(app_config)
+    tempo_client.session = FakeTempoSession([existing(1, '10', '2024-01-08')])
+    assert len(tempo_client.get_all_worklogs(START, END, account_id='test-account')) == 1
+
+    # Changed in Tempo after the listing was cached
+    tempo_client.session.worklogs[2] = existing(2, '11', '2024-01-09')
+    tempo_client.session.worklogs[1]['timeSpentSeconds'] = 7200
+
+    result = tempo_client.reconcile_worklogs(START, END, [planned('10', '2024-01-08', seconds=7200),
+                                                          planned('11', '2024-01-09')])
+
+    assert result == {"created": 0, "updated": 0, "deleted": 0, "unchanged": 2, "failed_days": []}
+    assert sorted(tempo_client.session.worklogs) == [1, 2]
@@ -0,0 +1,119 @@
+import configparser
+import random
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+
+import main
+from config.app_config import AppConfig
+from config.work_states import FINISH, START, SWITCH, WorkStateTable, parse_state_list
+
+STARTED = ['Review', 'Implement', 'Discuss / Design']
+FINISHED = ['Ready for review', 'PO review', 'PO Review', 'Merge', 'Done', 'Closed']
+OTHER = ['To Do', 'Blocked', 'Backlog', '', None]
+
+
+def write_config(tmp_path, config_file: str, **work_states: str) -> str:
+    parser = configparser.ConfigParser()
+    parser.read(config_file)
+    for option, value in work_states.items():
+        parser.set('work_states', option, value)
+    path = str(tmp_path / 'config.ini')
+    with open(path, 'w') as config_file:
+        parser.write(config_file)
+    return path
+
+
+@pytest.mark.parametrize('work_states, message', [
+    ({'started_work_states': ' , '}, 'started_work_states is empty'),
+    ({'finished_work_states': ''}, 'finished_work_states is empty'),
+    ({'finished_work_states': 'Done, implement '}, 'states both start and finish work: Implement'),
+    ({'priority_order': 'Meeting, Comment, Review, Discuss / Design'},
+     'started states missing from priority_order, their work would never be logged: Implement'),
+])
+def test_invalid_work_states_fail_to_load(tmp_path, config_file, work_states, message):
+    with pytest.raises(ValueError, match=message):
+        AppConfig(write_config(tmp_path, config_file, **work_states))
+
+
+def test_priority_order_names_started_states_as_configured():
+    table = WorkStateTable(parse_state_list('Review,In  Progress'), ['Done'])
+
+    assert table.priority_order(['Meeting', 'in progress', 'REVIEW']) == ['Meeting', 'In Progress', 'Review']
+
+
+def reference_transition(from_state: Optional[str], to_state: Optional[str]) -> Optional[str]:
+    """
+    The classification `add_issue_work` made by list membership before the table.
+    """
+    if to_state in STARTED and from_state not in STARTED:
+        return START
+    if to_state in FINISHED and from_state in STARTED:
+        return FINISH
+    if to_state in STARTED and from_state in STARTED:
+        return SWITCH
+    return None
+
+
+def test_classify_matches_the_list_membership_rules():
+    table = WorkStateTable(STARTED, FINISHED)
+    states = STARTED + FINISHED + OTHER
+
+    for from_state in states:
+        for to_state in states:
+            transition = table.classify(from_state, to_state)
+            kind = reference_transition(from_state, to_state)
+            assert (transition[0] if transition else None) == kind
+            # Work is closed under the type it was in and opened under the type it moves to
+            if kind in (FINISH, SWITCH):
+                assert transition[1] == from_state
+            if kind in (START, SWITCH):
+                assert transition[2] == to_state
+
+
+def test_classify_ignores_case_and_spacing():
+    table = WorkStateTable(STARTED, FINISHED)
+
+    assert table.classify('to do', ' implement ') == (START, 'to do', 'Implement')
+    assert table.classify('REVIEW', 'discuss  /  design') == (SWITCH, 'Review', 'Discuss / Design')
+    assert table.classify('review', 'done') == (FINISH, 'Review', 'Done')
+
+
+def reference_is_assigned(history: Any, account_id: str, direction: str) -> Optional[bool]:
+    """
+    The original `is_assigned`: True when an assignee change names the account, False when assignee changes name
+    someone else only, None without assignee changes.
+    """
+    result = None
+    for item in history.items:
+        if item.field == 'assignee':
+            if (direction == 'to' and item.to == account_id) or \
+                    (direction == 'from' and getattr(item, 'from') == account_id):
+                return True
+            result = False
+    return result
+
+
+def random_history(rng: random.Random, account_id: str) -> SimpleNamespace:
+    items: List[SimpleNamespace] = []
+    for _ in range(rng.randint(0, 4)):
+        if rng.random() < 0.5:
+            items.append(SimpleNamespace(field='assignee', to=rng.choice([account_id, 'someone-else', None]),
+                                         **{'from': rng.choice([account_id, 'someone-else', None])}))
+        else:
+            items.append(SimpleNamespace(field=rng.choice(['status', 'labels']), fromString=rng.choice(STARTED),
+                                         toString=rng.choice(FINISHED), to=None, **{'from': None}))
+    return SimpleNamespace(items=items)
+
+
+def test_classify_history_matches_is_assigned(config):
+    rng = random.Random(0)
+
+    for _ in range(2000):
+        history = random_history(rng, config.JIRA_ACCOUNT_ID)
+        assigned_to_me, assigned_from_me, status_items = main.classify_history(history)
+
+        assert assigned_to_me == reference_is_assigned(history, config.JIRA_ACCOUNT_ID, 'to')
+        assert assigned_from_me == reference_is_assigned(history, config.JIRA_ACCOUNT_ID, 'from')
+        assert status_items == [item for item in history.items if item.field == 'status']
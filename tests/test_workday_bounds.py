@@ -0,0 +1,40 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+import main
+from models.activity import Activity
+from planner import timeline
+
+# Zones whose first pytz offset is a local mean time, next to fixed-offset ones
+TIMEZONES = ['Europe/Istanbul', 'Asia/Kolkata', 'America/New_York', 'UTC', 'Etc/GMT-3']
+ENGINES = ['python', pytest.param('numpy', marks=pytest.mark.skipif(not timeline.is_available(),
+                                                                    reason="numpy is not installed"))]
+
+
+@pytest.mark.parametrize('timezone_name', TIMEZONES)
+@pytest.mark.parametrize('day', [date(2024, 1, 8), date(2024, 7, 8)])
+def test_workday_starts_at_the_configured_wall_clock_hour(use_config, timezone_name, day):
+    config = use_config(RUN_TIMEZONE=timezone_name)
+
+    day_start, day_end = main.get_day_time_bounds(day)
+
+    wall_clock = day_start.astimezone(timezone.utc).astimezone(main.context.tz)
+    assert wall_clock.strftime('%H:%M') == f"{config.WORKDAY_START_HOUR:02d}:00"
+    assert (day_end - day_start).total_seconds() == config.WORKDAY_DURATION_HOURS * 3600
+
+
+@pytest.mark.parametrize('timezone_name', TIMEZONES)
+@pytest.mark.parametrize('timeline_engine', ENGINES)
+def test_clipped_worklog_is_sent_with_workday_wall_clock(use_config, timezone_name, timeline_engine):
+    config = use_config(RUN_TIMEZONE=timezone_name, RUN_TIMELINE_ENGINE=timeline_engine)
+    work_type = next(work_type for work_type in config.PRIORITY_ORDER if work_type != 'Meeting')
+    activity = Activity(id='1', key='SYN-1', type=work_type,
+                        start_time=datetime(2024, 1, 8, 0, tzinfo=timezone.utc),
+                        end_time=datetime(2024, 1, 8, 23, tzinfo=timezone.utc))
+
+    worklogs = main.plan_worklogs([activity], [], datetime(2024, 1, 1, tzinfo=timezone.utc),
+                                  datetime(2024, 1, 15, tzinfo=timezone.utc))
+
+    assert [(worklog.start_time.strftime('%Y-%m-%d %H:%M'), worklog.end_time.strftime('%H:%M'))
+            for worklog in worklogs] == [('2024-01-08 09:00', '17:00')]
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Any, Collection, Dict, Optional, TYPE_CHECKING
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from utils.metrics import RunMetrics
+
+
+def build_session(pool_size: int, auth: Any = None, headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """
+    Creates a keep-alive session whose connection pool is large enough for `pool_size` concurrent workers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if auth is not None:
+        session.auth = auth
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class RateLimiter:
+    """
+    Spaces the requests of all threads sharing it out to at most `requests_per_second`, unlimited when 0.
+    """
+
+    def __init__(self, requests_per_second: float) -> None:
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def request_with_backoff(session: requests.Session, method: str, url: str, max_retries: int = 5,
+                         backoff_seconds: float = 1.0, retry_statuses: Collection[int] = (429,),
+                         metrics: Optional['RunMetrics'] = None, client: str = 'http',
+                         rate_limiter: Optional[RateLimiter] = None, **kwargs: Any) -> requests.Response:
+    """
+    Sends a request and retries it with exponential backoff while the server answers with a retryable status.
+    A `Retry-After` header sent by the server takes precedence over the computed delay.
+    Retries are counted under `client` in `metrics` when given, every attempt waits for its turn in `rate_limiter`.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        response = session.request(method, url, **kwargs)
+        if response.status_code not in retry_statuses or attempt >= max_retries:
+            return response
+        if metrics is not None:
+            metrics.record_retry(client)
+        time.sleep(_retry_delay(response, backoff_seconds * (2 ** attempt)))
+        attempt += 1
+
+
+def _retry_delay(response: requests.Response, default: float) -> float:
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        return default
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        return default
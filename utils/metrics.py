@@ -0,0 +1,271 @@
+import cProfile
+import json
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import requests
+
+T = TypeVar('T')
+
+TRACEMALLOC_TOP_ALLOCATIONS = 10
+# Latencies kept per client for the percentiles, a resident daemon must not keep every one of them
+LATENCY_SAMPLE_SIZE = 1024
+
+
+class LatencySummary:
+    """
+    Count, sum and maximum of request latencies, with a uniform reservoir sample of them for the percentiles.
+    Percentiles are exact until `LATENCY_SAMPLE_SIZE` requests were recorded and estimated from the sample after.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+        self._random = random.Random()
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < LATENCY_SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < LATENCY_SAMPLE_SIZE:
+                self.samples[slot] = seconds
+
+    def merge(self, other: 'LatencySummary') -> None:
+        count = self.count + other.count
+        if len(self.samples) + len(other.samples) > LATENCY_SAMPLE_SIZE:
+            # Each side keeps a share of the sample proportional to the requests it saw
+            own = round(LATENCY_SAMPLE_SIZE * self.count / count)
+            self.samples = (self._random.sample(self.samples, min(own, len(self.samples))) +
+                            self._random.sample(other.samples, min(LATENCY_SAMPLE_SIZE - own, len(other.samples))))
+        else:
+            self.samples = self.samples + other.samples
+        self.count = count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        return _percentile(sorted(self.samples), fraction)
+
+
+class RunMetrics:
+    """
+    Collects the wall time of pipeline stages, the HTTP requests of each API client and counts of processed objects.
+    Safe to record into from worker threads; metrics of worker processes are combined with `merge`.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self.stage_calls: Counter = Counter()
+        self.request_statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.request_latencies: Dict[str, LatencySummary] = defaultdict(LatencySummary)
+        self.retries: Counter = Counter()
+        self.counts: Counter = Counter()
+        self.memory: Optional[Dict[str, Any]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_stage(name, time.perf_counter() - started)
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Yields from the iterable, accounting the time spent producing each item to the stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._add_stage(name, time.perf_counter() - started)
+                return
+            self._add_stage(name, time.perf_counter() - started)
+            yield item
+
+    def _add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stage_seconds[name] += seconds
+            self.stage_calls[name] += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += amount
+
+    def record_request(self, client: str, status: Any, seconds: float) -> None:
+        with self._lock:
+            self.request_statuses[client][str(status)] += 1
+            self.request_latencies[client].add(seconds)
+
+    def record_retry(self, client: str) -> None:
+        with self._lock:
+            self.retries[client] += 1
+
+    @contextmanager
+    def timed_request(self, client: str) -> Iterator[None]:
+        """
+        Records a request sent by a library that does not go through a `requests` session.
+        """
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            yield
+            status = 200
+        finally:
+            self.record_request(client, status, time.perf_counter() - started)
+
+    def instrument(self, session: requests.Session, client: str) -> None:
+        """
+        Records every response the session receives, including each retried attempt.
+        """
+        def record(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+            self.record_request(client, response.status_code, response.elapsed.total_seconds())
+
+        session.hooks['response'].append(record)
+
+    def merge(self, other: 'RunMetrics') -> None:
+        with self._lock:
+            for name, seconds in other.stage_seconds.items():
+                self.stage_seconds[name] += seconds
+            self.stage_calls.update(other.stage_calls)
+            for client, statuses in other.request_statuses.items():
+                self.request_statuses[client].update(statuses)
+            for client, latencies in other.request_latencies.items():
+                self.request_latencies[client].merge(latencies)
+            self.retries.update(other.retries)
+            self.counts.update(other.counts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the JSON run report.
+        """
+        with self._lock:
+            report = {
+                'started_at': self.started_at.isoformat(),
+                'duration_seconds': time.perf_counter() - self._started,
+                'stages': {name: {'seconds': seconds, 'calls': self.stage_calls[name]}
+                           for name, seconds in self.stage_seconds.items()},
+                'http': {client: self._client_report(client) for client in self.request_statuses},
+                'counts': dict(self.counts)
+            }
+            if self.memory is not None:
+                report['memory'] = self.memory
+        return report
+
+    def _client_report(self, client: str) -> Dict[str, Any]:
+        statuses = self.request_statuses[client]
+        latencies = self.request_latencies[client]
+        return {
+            'requests': sum(statuses.values()),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith(('1', '2', '3'))),
+            'retries': self.retries[client],
+            'statuses': dict(statuses),
+            'latency_seconds': {
+                'total': latencies.total,
+                'mean': latencies.total / latencies.count,
+                'p50': latencies.percentile(0.5),
+                'p95': latencies.percentile(0.95),
+                'max': latencies.max
+            }
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the report in the Prometheus text exposition format, e.g. for the node_exporter textfile collector.
+        """
+        report = self.to_dict()
+        lines = [
+            '# HELP tempofill_run_duration_seconds Wall time of the run.',
+            '# TYPE tempofill_run_duration_seconds gauge',
+            f"tempofill_run_duration_seconds {report['duration_seconds']}",
+            '# HELP tempofill_stage_seconds Wall time spent in each pipeline stage.',
+            '# TYPE tempofill_stage_seconds gauge'
+        ]
+        lines += [f'tempofill_stage_seconds{{stage="{name}"}} {stage["seconds"]}'
+                  for name, stage in report['stages'].items()]
+        lines += ['# HELP tempofill_http_requests_total HTTP responses received by each API client.',
+                  '# TYPE tempofill_http_requests_total counter']
+        lines += [f'tempofill_http_requests_total{{client="{client}",status="{status}"}} {count}'
+                  for client, http in report['http'].items() for status, count in http['statuses'].items()]
+        lines += ['# HELP tempofill_http_request_duration_seconds Latency of the HTTP requests of each API client.',
+                  '# TYPE tempofill_http_request_duration_seconds summary']
+        for client, http in report['http'].items():
+            latency = http['latency_seconds']
+            lines += [f'tempofill_http_request_duration_seconds{{client="{client}",quantile="0.5"}} {latency["p50"]}',
+                      f'tempofill_http_request_duration_seconds{{client="{client}",quantile="0.95"}} {latency["p95"]}',
+                      f'tempofill_http_request_duration_seconds_sum{{client="{client}"}} {latency["total"]}',
+                      f'tempofill_http_request_duration_seconds_count{{client="{client}"}} {http["requests"]}']
+        lines += ['# HELP tempofill_http_retries_total Requests retried after a rate limit or server error.',
+                  '# TYPE tempofill_http_retries_total counter']
+        lines += [f'tempofill_http_retries_total{{client="{client}"}} {http["retries"]}'
+                  for client, http in report['http'].items()]
+        lines += ['# HELP tempofill_objects Objects processed by the run.',
+                  '# TYPE tempofill_objects gauge']
+        lines += [f'tempofill_objects{{kind="{kind}"}} {count}' for kind, count in report['counts'].items()]
+        return '\n'.join(lines) + '\n'
+
+    def write_reports(self, report_file: str = '', prometheus_file: str = '') -> None:
+        if report_file:
+            with open(report_file, 'w') as file:
+                json.dump(self.to_dict(), file, indent=4)
+        if prometheus_file:
+            with open(prometheus_file, 'w') as file:
+                file.write(self.to_prometheus())
+
+
+@contextmanager
+def profiling(metrics: RunMetrics, profile_file: str = '', trace_memory: bool = False) -> Iterator[None]:
+    """
+    Runs the block under cProfile, writing the stats to `profile_file`, and under tracemalloc, adding the peak and
+    the largest allocation sites to the run report. Both are off unless asked for, they slow the run down.
+    """
+    profiler = cProfile.Profile() if profile_file else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TRACEMALLOC_TOP_ALLOCATIONS]
+            tracemalloc.stop()
+            metrics.memory = {
+                'peak_kib': peak / 1024,
+                'top_allocations': [{'location': str(stat.traceback), 'size_kib': stat.size / 1024,
+                                     'count': stat.count} for stat in top]
+            }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any
+
+JIRA_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+# Offsets only change on quarter hours in every timezone, so conversions are shared within that window
+OFFSET_BUCKET_SECONDS = 15 * 60
+
+
+@lru_cache(maxsize=64)
+def _fixed_offset(offset: str) -> timezone:
+    sign = -1 if offset[0] == '-' else 1
+    return timezone(sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+
+
+@lru_cache(maxsize=65536)
+def parse_jira_timestamp(value: str) -> datetime:
+    """
+    Parses a Jira timestamp such as `2023-12-01T10:15:30.123+0300`.
+    The common millisecond form is sliced directly, anything else goes through `strptime`.
+    """
+    if len(value) == 28 and value[10] == 'T' and value[19] == '.' and value[23] in '+-':
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                        int(value[20:23]) * 1000, tzinfo=_fixed_offset(value[23:]))
+    return datetime.strptime(value, JIRA_TIMESTAMP_FORMAT)
+
+
+def created_at(record: Any) -> datetime:
+    """
+    Returns the parsed `created` timestamp of a changelog history or comment, parsing it only once per record.
+    """
+    parsed = getattr(record, '_created_at', None)
+    if parsed is None:
+        parsed = parse_jira_timestamp(record.created)
+        setattr(record, '_created_at', parsed)
+    return parsed
+
+
+@lru_cache(maxsize=8192)
+def _offset_for_bucket(tz: tzinfo, bucket: int) -> timezone:
+    moment = datetime.fromtimestamp(bucket * OFFSET_BUCKET_SECONDS, tz=timezone.utc)
+    return timezone(moment.astimezone(tz).utcoffset())
+
+
+def localize(value: datetime, tz: tzinfo) -> datetime:
+    """
+    Attaches `tz` to a naive wall-clock time. pytz zones must go through `localize`, `replace` would give them
+    their first historical offset, e.g. the local mean time of the city.
+    """
+    if hasattr(tz, 'localize'):
+        return tz.localize(value)
+    return value.replace(tzinfo=tz)
+
+
+def to_timezone(value: datetime, tz: tzinfo) -> datetime:
+    """
+    Same instant as `value.astimezone(tz)`, with the zone's offset looked up once per quarter hour.
+    """
+    bucket = int(value.timestamp()) // OFFSET_BUCKET_SECONDS
+    return value.astimezone(_offset_for_bucket(tz, bucket))